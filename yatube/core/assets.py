@@ -0,0 +1,178 @@
+import mimetypes
+import os
+import re
+from wsgiref.headers import Headers
+
+from django.conf import settings
+from django.utils.http import http_date, parse_http_date_safe
+
+BLOCK_SIZE = 64 * 1024
+
+# Хэш в имени: ManifestStaticFilesStorage (style.0123456789ab.css),
+# картинки постов (posts/ab/<sha256>.jpg) и их копии (<md5>-960.webp).
+HASHED_STATIC = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+HASHED_MEDIA = re.compile(r'/(?:[0-9a-f]{64}|[0-9a-f]{32}-\d+)\.\w+$')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _file_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        file.close()
+
+
+class AssetServer:
+    """WSGI-обертка, которая отдает статику и медиа без Django.
+
+    Файлы с хэшем содержимого в имени кэшируются навсегда
+    (immutable), остальные — с проверкой по ETag и Last-Modified.
+    Поддерживает If-None-Match, If-Modified-Since и один диапазон
+    Range; другие Range игнорируются (RFC 7233). Скрытые файлы
+    (.lock и т. п.) не отдаются. Целый файл отдается через
+    wsgi.file_wrapper: gunicorn и uWSGI пересылают его через sendfile,
+    без копирования в Python.
+    """
+
+    def __init__(self, application, mounts=None):
+        self.application = application
+        if mounts is None:
+            mounts = (
+                (settings.STATIC_URL, settings.STATIC_ROOT, HASHED_STATIC),
+                (settings.MEDIA_URL, settings.MEDIA_ROOT, HASHED_MEDIA),
+            )
+        self.mounts = [
+            (prefix, os.path.realpath(root), hashed)
+            for prefix, root, hashed in mounts if prefix and root
+        ]
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        for prefix, root, hashed in self.mounts:
+            if path.startswith(prefix):
+                return self.serve(environ, start_response, root,
+                                  path[len(prefix):], hashed)
+        return self.application(environ, start_response)
+
+    def respond(self, start_response, status, headers=(), body=b''):
+        headers = Headers(list(headers))
+        headers.setdefault('Content-Length', str(len(body)))
+        start_response(status, headers.items())
+        return [body]
+
+    def serve(self, environ, start_response, root, name, hashed):
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self.respond(start_response, '405 Method Not Allowed',
+                                [('Allow', 'GET, HEAD')])
+        path = self.resolve(root, name)
+        if path is None:
+            return self.respond(start_response, '404 Not Found')
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        content_type, encoding = mimetypes.guess_type(path)
+        headers = Headers([
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('ETag', etag),
+            ('Last-Modified', http_date(stat.st_mtime)),
+            ('Cache-Control', IMMUTABLE if hashed.search(name)
+             else REVALIDATE),
+            ('Accept-Ranges', 'bytes'),
+        ])
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        if self.not_modified(environ, etag, stat.st_mtime):
+            del headers['Content-Type']
+            return self.respond(start_response, '304 Not Modified',
+                                headers.items())
+
+        try:
+            status, start, length = self.requested_range(
+                environ, headers, etag, stat.st_size
+            )
+        except ValueError:
+            headers['Content-Range'] = f'bytes */{stat.st_size}'
+            return self.respond(start_response, '416 Range Not Satisfiable',
+                                headers.items())
+        headers['Content-Length'] = str(length)
+        start_response(status, headers.items())
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return [b'']
+        file = open(path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if length == stat.st_size and file_wrapper is not None:
+            return file_wrapper(file, BLOCK_SIZE)
+        return _file_range(file, start, length)
+
+    def requested_range(self, environ, headers, etag, size):
+        """Статус, начало и длина ответа с учетом Range и If-Range."""
+        byte_range = environ.get('HTTP_RANGE')
+        if byte_range and environ.get('HTTP_IF_RANGE', etag) == etag:
+            parsed = self.parse_range(byte_range, size)
+            if parsed is not None:
+                start, length = parsed
+                headers['Content-Range'] = (
+                    f'bytes {start}-{start + length - 1}/{size}'
+                )
+                return '206 Partial Content', start, length
+        return '200 OK', 0, size
+
+    @staticmethod
+    def resolve(root, name):
+        """Путь к файлу name внутри root или None: вне root, не файл
+        или скрытый (служебные файлы хранилища)."""
+        path = os.path.realpath(os.path.join(root, name))
+        if os.path.commonpath((root, path)) != root or not os.path.isfile(
+            path
+        ):
+            return None
+        if any(part.startswith('.')
+               for part in os.path.relpath(path, root).split(os.sep)):
+            return None
+        return path
+
+    @staticmethod
+    def not_modified(environ, etag, mtime):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags
+        since = parse_http_date_safe(
+            environ.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return since is not None and int(mtime) <= since
+
+    @staticmethod
+    def parse_range(value, size):
+        """(начало, длина) для «bytes=a-b», «bytes=a-», «bytes=-n».
+
+        None — заголовок не понят (несколько диапазонов, другие
+        единицы, a > b), и файл отдается целиком. ValueError — диапазон
+        за пределами файла (ответ 416).
+        """
+        match = RANGE.match(value.strip())
+        if match is None:
+            return None
+        first, last = match.groups()
+        if not (first or last) or first and last and int(first) > int(
+            last
+        ):
+            return None
+        if not first:
+            length = min(int(last), size)
+            if length == 0:
+                raise ValueError('Пустой диапазон')
+            return size - length, length
+        start = int(first)
+        if start >= size:
+            raise ValueError('Диапазон за концом файла')
+        end = min(int(last), size - 1) if last else size - 1
+        return start, end - start + 1
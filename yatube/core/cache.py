@@ -0,0 +1,176 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+_MISSING = object()
+LOCK_STRIPES = 64
+
+LOOKUPS = metrics.counter(
+    'yatube_near_cache_lookups_total',
+    'Чтения NearCache по уровню ответа: local, shared или miss.',
+    ('level',),
+)
+
+
+class NearCache(BaseCache):
+    """Двухуровневый кэш: LRU в памяти процесса перед общим кэшем.
+
+    Общий кэш (OPTIONS['SHARED_ALIAS']) один на все воркеры, локальный
+    уровень отвечает без сетевого запроса. Локальная копия живет
+    не дольше LOCAL_TIMEOUT секунд: удаление ключа в другом воркере
+    станет видно здесь не позже этого срока, поэтому изменяемые
+    значения (счетчики поколений) читают из общего кэша напрямую.
+    Память локального уровня ограничена MAX_ENTRIES и MAX_BYTES.
+    get_or_set вычисляет значение один раз на процесс, даже если
+    его одновременно запросили несколько потоков.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._max_bytes = options.get('MAX_BYTES', 16 * 1024 * 1024)
+        self._local = OrderedDict()
+        self._local_bytes = 0
+        self._lock = threading.Lock()
+        self._flight_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, data = entry
+            if expires_at < time.monotonic():
+                self._local_pop(key)
+                return _MISSING
+            self._local.move_to_end(key)
+        return pickle.loads(data)
+
+    def _local_pop(self, key):
+        entry = self._local.pop(key, None)
+        if entry is not None:
+            self._local_bytes -= len(entry[1])
+
+    def _local_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        local_timeout = self._local_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            local_timeout = min(local_timeout, timeout)
+        if local_timeout <= 0:
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self._max_bytes:
+            return
+        with self._lock:
+            self._local_pop(key)
+            self._local[key] = (time.monotonic() + local_timeout, data)
+            self._local_bytes += len(data)
+            while (len(self._local) > self._max_entries
+                   or self._local_bytes > self._max_bytes):
+                _, (_, evicted) = self._local.popitem(last=False)
+                self._local_bytes -= len(evicted)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local_pop(key)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_key(key, version)
+        value = self._local_get(local_key)
+        if value is not _MISSING:
+            LOOKUPS.inc(level='local')
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            LOOKUPS.inc(level='miss')
+            return default
+        LOOKUPS.inc(level='shared')
+        self._local_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            value = self._local_get(self.make_key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            for key, value in shared.items():
+                self._local_set(self.make_key(key, version), value)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(self.make_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version) or []
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(self.make_key(key, version), value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._local_set(self.make_key(key, version), value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(self.make_key(key, version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._local_delete(self.make_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local_get(self.make_key(key, version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local_delete(self.make_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            self._local_bytes = 0
+        self.shared.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        local_key = self.make_key(key, version)
+        with self._flight_locks[hash(local_key) % LOCK_STRIPES]:
+            # Пока ждали блокировку, значение мог посчитать другой поток.
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                return value
+            if callable(default):
+                default = default()
+            if default is not None:
+                self.add(key, default, timeout=timeout, version=version)
+                return self.get(key, default, version=version)
+        return default
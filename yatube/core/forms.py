@@ -0,0 +1,15 @@
+from django import forms
+
+
+class ProfilerToggleForm(forms.Form):
+    sample_rate = forms.FloatField(
+        label='Доля запросов', min_value=0, max_value=1, initial=0.01,
+    )
+    minutes = forms.IntegerField(
+        label='На сколько минут', min_value=1, max_value=24 * 60,
+        initial=15,
+    )
+    path_prefix = forms.CharField(
+        label='Начало пути', required=False, max_length=200,
+        help_text='Только запросы с таким началом пути; пусто — все.',
+    )
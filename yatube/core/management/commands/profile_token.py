@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sampler import make_token
+
+
+class Command(BaseCommand):
+    help = ('Выдает значение заголовка X-Profile: запрос с ним '
+            'профилируется и сохраняется в PROFILER_DIR.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
+        self.stderr.write(
+            f'Токен действует {settings.PROFILER_TOKEN_MAX_AGE} с. Пример: '
+            f'curl -H "X-Profile: <токен>" http://localhost:8000/'
+        )
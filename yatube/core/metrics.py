@@ -0,0 +1,341 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import locks
+
+from .profiling import view_name
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+# Сумма файлов завершившихся воркеров.
+ARCHIVE = 'archive.json'
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_registry = {}
+
+
+class Metric:
+    """Метрика с метками: значения хранятся по кортежу значений меток."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        return [
+            [list(key), list(value) if isinstance(value, list) else value]
+            for key, value in self.values.items()
+        ]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        _store.changed()
+
+
+class Histogram(Metric):
+    """Гистограмма: число наблюдений по корзинам, сумма и количество.
+
+    Значение по меткам — список [корзина1, ..., корзинаN, +Inf, сумма];
+    корзины не накопительные, накопительными их делает вывод.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(self.buckets) + 2)
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+        _store.changed()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def _register(cls, name, documentation, labelnames=(), **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, documentation, labelnames,
+                                           **kwargs)
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    """Счетчик name из реестра; повторный вызов вернет тот же объект."""
+    return _register(Counter, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, documentation, labelnames,
+                     buckets=buckets)
+
+
+class ProcessStore:
+    """Файл значений этого процесса в METRICS_DIR.
+
+    Каждый воркер пишет свои значения в отдельный файл (не чаще
+    раза в METRICS_FLUSH_INTERVAL секунд и при выходе), /metrics
+    складывает файлы всех воркеров. Счетчики завершившихся воркеров
+    входят в сумму, как в Prometheus, но их файлы /metrics сливает
+    в один ARCHIVE. Ошибка записи только пишется в лог: метрики
+    не должны ронять запрос.
+    """
+
+    def __init__(self):
+        self.pid = None
+        self.path = None
+        self.flushed = 0.0
+
+    def _check_fork(self):
+        # Дочерний процесс после fork унаследовал значения родителя:
+        # они уже посчитаны в файле родителя.
+        if self.pid != os.getpid():
+            if self.pid is not None:
+                with _lock:
+                    for metric in _registry.values():
+                        metric.values.clear()
+            self.pid = os.getpid()
+            self.path = None
+
+    def changed(self):
+        if not settings.METRICS_DIR:
+            return
+        self._check_fork()
+        now = time.monotonic()
+        if now - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not settings.METRICS_DIR:
+            return
+        self._check_fork()
+        # Следующая попытка — не раньше чем через интервал, даже если
+        # эта не удалась.
+        self.flushed = time.monotonic()
+        try:
+            if self.path is None or (os.path.dirname(self.path)
+                                     != settings.METRICS_DIR):
+                os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                self.path = os.path.join(
+                    settings.METRICS_DIR,
+                    f'{self.pid}-{uuid.uuid4().hex[:8]}.json',
+                )
+            with _lock:
+                data = {name: metric.snapshot()
+                        for name, metric in _registry.items()}
+            temporary = f'{self.path}.tmp'
+            with open(temporary, 'w') as stream:
+                json.dump(data, stream)
+            os.replace(temporary, self.path)
+        except OSError as error:
+            logger.warning('Метрики не записаны в %s: %s',
+                           settings.METRICS_DIR, error)
+
+
+_store = ProcessStore()
+atexit.register(_store.flush)
+
+
+def _merge(totals, name, entries):
+    values = totals.setdefault(name, {})
+    for key, value in entries:
+        key = tuple(key)
+        if key not in values:
+            values[key] = value
+        elif isinstance(value, list):
+            values[key] = [a + b for a, b in zip(values[key], value)]
+        else:
+            values[key] += value
+
+
+def _read(path):
+    try:
+        with open(path) as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю.
+        return True
+    return True
+
+
+def _dead_files(directory):
+    for file_name in os.listdir(directory):
+        pid, _, rest = file_name.partition('-')
+        if rest.endswith('.json') and pid.isdigit() and not _alive(int(pid)):
+            yield os.path.join(directory, file_name)
+
+
+def _compact(directory):
+    """Сливает файлы завершившихся воркеров в ARCHIVE.
+
+    Иначе каталог растет с каждым перезапуском, а /metrics читает
+    все файлы. Блокировка — от одновременного слияния двумя воркерами.
+    """
+    with open(os.path.join(directory, '.lock'), 'a') as lock_file:
+        locks.lock(lock_file, locks.LOCK_EX)
+        try:
+            dead = list(_dead_files(directory))
+            if not dead:
+                return
+            archive = os.path.join(directory, ARCHIVE)
+            totals = {}
+            for path in [archive, *dead]:
+                for name, entries in (_read(path) or {}).items():
+                    _merge(totals, name, entries)
+            temporary = f'{archive}.tmp'
+            with open(temporary, 'w') as stream:
+                json.dump({
+                    name: [[list(key), value]
+                           for key, value in values.items()]
+                    for name, values in totals.items()
+                }, stream)
+            os.replace(temporary, archive)
+            for path in dead:
+                os.remove(path)
+        finally:
+            locks.unlock(lock_file)
+
+
+def collect():
+    """Значения всех метрик, сложенные по всем воркерам."""
+    totals = {}
+    if settings.METRICS_DIR:
+        _store.flush()
+        try:
+            _compact(settings.METRICS_DIR)
+            file_names = os.listdir(settings.METRICS_DIR)
+        except OSError as error:
+            logger.warning('Метрики не прочитаны из %s: %s',
+                           settings.METRICS_DIR, error)
+            file_names = []
+        for file_name in file_names:
+            if not file_name.endswith('.json'):
+                continue
+            data = _read(os.path.join(settings.METRICS_DIR, file_name))
+            for name, entries in (data or {}).items():
+                _merge(totals, name, entries)
+    else:
+        with _lock:
+            for name, metric in _registry.items():
+                _merge(totals, name, metric.snapshot())
+    return totals
+
+
+def _escape(value):
+    return (value.replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Текстовый формат Prometheus (version 0.0.4)."""
+    totals = collect()
+    lines = []
+    with _lock:
+        metrics = sorted(_registry.items())
+    for name, metric in metrics:
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(totals.get(name, {}).items()):
+            if metric.kind == 'counter':
+                lines.append(
+                    f'{name}{_labels(metric.labelnames, key)} '
+                    f'{_format(value)}'
+                )
+                continue
+            cumulative = 0
+            bounds = [repr(float(b)) for b in metric.buckets] + ['+Inf']
+            for bound, count in zip(bounds, value):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket'
+                    f'{_labels(metric.labelnames, key, [("le", bound)])} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{name}_sum{_labels(metric.labelnames, key)} '
+                         f'{_format(value[-1])}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, key)} '
+                         f'{cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+REQUESTS = counter(
+    'yatube_http_requests_total', 'Ответы по представлениям и кодам.',
+    ('view', 'method', 'status'),
+)
+REQUEST_SECONDS = histogram(
+    'yatube_http_request_duration_seconds',
+    'Время ответа по представлениям.', ('view',),
+)
+
+
+class MetricsMiddleware:
+    """Число и время ответов каждого представления."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        view = view_name(request)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, view=view)
+        REQUESTS.inc(view=view, method=request.method,
+                     status=response.status_code)
+        return response
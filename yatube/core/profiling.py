@@ -0,0 +1,226 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template import base
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_MISSING = object()
+_original_render = base.Template.render
+
+
+def current_profile():
+    """Замеры текущего запроса или None, если запрос не попал в выборку."""
+    return getattr(_local, 'profile', None)
+
+
+class Profile:
+    """Замеры одного запроса: SQL, шаблоны и обращения к кэшу."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        # Одинаковый текст запроса — «похожие» (N+1), одинаковые еще
+        # и параметры — дубликаты, которые можно было не выполнять.
+        self.statements = Counter()
+        self.executions = Counter()
+        self.cache = defaultdict(Counter)
+
+    def query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.statements[sql] += 1
+            self.executions[(sql, repr(params))] += 1
+
+    @property
+    def queries(self):
+        return sum(self.statements.values())
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.executions.values())
+
+    @property
+    def similar(self):
+        return sum(count - 1 for count in self.statements.values())
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 3),
+            'sql_queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 3),
+            'sql_duplicates': self.duplicates,
+            'sql_similar': self.similar,
+            'template_ms': round(self.template_time * 1000, 3),
+            'cache': {alias: dict(counts)
+                      for alias, counts in self.cache.items()},
+        }
+
+    def server_timing(self):
+        metrics = [
+            f'total;dur={self.total * 1000:.1f}',
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.queries} '
+            f'queries, {self.duplicates} duplicates"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+        ]
+        for alias, counts in self.cache.items():
+            metrics.append(f'cache-{alias};desc="{counts["hits"]} hits, '
+                           f'{counts["misses"]} misses"')
+        return ', '.join(metrics)
+
+
+def _profiled_render(self, context):
+    # Вложенные шаблоны ({% include %}) входят во время внешнего.
+    profile = current_profile()
+    if profile is None or profile.template_depth:
+        return _original_render(self, context)
+    profile.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        profile.template_depth -= 1
+        profile.template_time += time.perf_counter() - started
+
+
+def install_template_timer():
+    """Подменяет Template.render замером; вне выборки — одна проверка."""
+    base.Template.render = _profiled_render
+
+
+@contextmanager
+def _count_cache(profile):
+    # Экземпляры кэшей свои у каждого потока, поэтому подмена методов
+    # на время запроса не задевает параллельные запросы.
+    patched = []
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        counts = profile.cache[alias]
+
+        def get(key, default=None, version=None, _get=cache.get,
+                _counts=counts):
+            value = _get(key, _MISSING, version=version)
+            if value is _MISSING:
+                _counts['misses'] += 1
+                return default
+            _counts['hits'] += 1
+            return value
+
+        def get_many(keys, version=None, _get_many=cache.get_many,
+                     _counts=counts):
+            keys = list(keys)
+            found = _get_many(keys, version=version)
+            _counts['hits'] += len(found)
+            _counts['misses'] += len(keys) - len(found)
+            return found
+
+        cache.get, cache.get_many = get, get_many
+        patched.append(cache)
+    try:
+        yield
+    finally:
+        for cache in patched:
+            del cache.get, cache.get_many
+
+
+class ViewStats:
+    """Суммы замеров по представлениям с запуска процесса."""
+    FIELDS = ('total_ms', 'sql_queries', 'sql_ms', 'sql_duplicates',
+              'template_ms')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(Counter)
+
+    def add(self, view, record):
+        with self._lock:
+            totals = self._views[view]
+            totals['requests'] += 1
+            for field in self.FIELDS:
+                totals[field] += record[field]
+            for counts in record['cache'].values():
+                totals['cache_hits'] += counts.get('hits', 0)
+                totals['cache_misses'] += counts.get('misses', 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {view: dict(totals)
+                    for view, totals in self._views.items()}
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+stats = ViewStats()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+class ProfilingMiddleware:
+    """Замеряет выборку запросов (PROFILING_SAMPLE_RATE).
+
+    Число и время SQL-запросов, дубликаты, время шаблонов и попадания
+    в кэш уходят в лог core.profiling (одна JSON-строка на запрос)
+    и в суммы по представлениям (core.views.profiling_stats), а для
+    персонала — еще и в заголовок Server-Timing: остальным устройство
+    сайта не показывается. Запросы вне выборки проходят без замеров.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+
+    def sampled(self, request):
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self.sampled(request):
+            return self.get_response(request)
+        profile = _local.profile = Profile()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.query)
+                    )
+                stack.enter_context(_count_cache(profile))
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        profile.finish()
+        record = profile.as_dict()
+        view = view_name(request)
+        stats.add(view, record)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = profile.server_timing()
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **record,
+        }, ensure_ascii=False))
+        return response
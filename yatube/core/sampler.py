@@ -0,0 +1,249 @@
+"""Профилирование отдельных запросов снятием стека.
+
+Пока выбранный запрос выполняется, фоновый поток раз
+в PROFILER_INTERVAL секунд снимает стек потока запроса. Одинаковые
+стеки складываются, результат пишется в PROFILER_DIR в свернутом
+формате («a;b;c число» в строке), который читают flamegraph.pl,
+speedscope и inferno. Запросы вне выборки не замедляются: проверка —
+stat файла переключателя PROFILER_DIR/.toggle, сам файл читается,
+только когда изменился.
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+
+from .profiling import view_name
+
+HEADER = 'HTTP_X_PROFILE'
+SALT = 'core.sampler'
+# Не .json: такие файлы в PROFILER_DIR — описания профилей.
+TOGGLE = '.toggle'
+OFF = {'sample_rate': 0.0, 'path_prefix': '', 'until': 0.0}
+STACKS = '.folded'
+META = '.json'
+_NAME = re.compile(r'^[\w-]+$')
+
+
+def make_token():
+    """Значение заголовка X-Profile, действует PROFILER_TOKEN_MAX_AGE."""
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def valid_token(value):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            value, max_age=settings.PROFILER_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+# Прочитанный переключатель: путь -> (inode и время изменения, значение).
+_toggles = {}
+
+
+def get_toggle():
+    # Переключатель — файл, а не кэш: кэш по умолчанию свой у каждого
+    # процесса, а PROFILER_DIR общий для воркеров машины.
+    path = os.path.join(settings.PROFILER_DIR, TOGGLE)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return OFF
+    version = (stat.st_ino, stat.st_mtime_ns)
+    cached = _toggles.get(path)
+    if cached is None or cached[0] != version:
+        try:
+            with open(path, encoding='utf-8') as stream:
+                cached = _toggles[path] = (version, json.load(stream))
+        except (OSError, ValueError):
+            return OFF
+    return cached[1]
+
+
+def _set_toggle(toggle):
+    os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILER_DIR, TOGGLE)
+    # Через замену файла: воркер не прочитает его недописанным.
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as stream:
+        json.dump(toggle, stream)
+    os.replace(f'{path}.tmp', path)
+
+
+def enable(sample_rate, minutes, path_prefix=''):
+    """Профилировать долю sample_rate запросов следующие minutes минут.
+
+    Все воркеры с тем же PROFILER_DIR видят изменение со следующего
+    запроса.
+    """
+    _set_toggle({
+        'sample_rate': sample_rate,
+        'path_prefix': path_prefix,
+        'until': time.time() + minutes * 60,
+    })
+
+
+def disable():
+    _set_toggle(OFF)
+
+
+def sampled(request):
+    toggle = get_toggle()
+    return (toggle['until'] > time.time()
+            and request.path.startswith(toggle['path_prefix'])
+            and random.random() < toggle['sample_rate'])
+
+
+def fold(frame):
+    """Стек от корня к frame в виде «модуль:функция;...»."""
+    names = []
+    while frame is not None:
+        names.append(f'{frame.f_globals.get("__name__", "?")}:'
+                     f'{frame.f_code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Снимает стек потока thread_id раз в interval секунд."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[fold(frame)] += 1
+            frame = None
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+def _path(name, extension):
+    return os.path.join(settings.PROFILER_DIR, name + extension)
+
+
+def save_capture(stacks, meta):
+    """Пишет стеки и описание профиля, возвращает имя профиля."""
+    os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+    name = f'{datetime.now():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:6]}'
+    with open(_path(name, STACKS), 'w', encoding='utf-8') as stream:
+        for stack, count in sorted(stacks.items()):
+            stream.write(f'{stack} {count}\n')
+    # Описание пишется последним: список профилей строится по нему.
+    with open(_path(name, META), 'w', encoding='utf-8') as stream:
+        json.dump({'name': name, **meta}, stream, ensure_ascii=False)
+    _prune()
+    return name
+
+
+def _names():
+    if not os.path.isdir(settings.PROFILER_DIR):
+        return []
+    return sorted(
+        (file_name[:-len(META)]
+         for file_name in os.listdir(settings.PROFILER_DIR)
+         if file_name.endswith(META)),
+        reverse=True,
+    )
+
+
+def _prune():
+    for name in _names()[settings.PROFILER_MAX_CAPTURES:]:
+        for extension in (META, STACKS):
+            try:
+                os.remove(_path(name, extension))
+            except FileNotFoundError:
+                pass
+
+
+def list_captures():
+    """Описания сохраненных профилей, новые первыми."""
+    captures = []
+    for name in _names():
+        try:
+            with open(_path(name, META), encoding='utf-8') as stream:
+                captures.append(json.load(stream))
+        except (OSError, ValueError):
+            continue
+    return captures
+
+
+def stacks_path(name):
+    """Путь к файлу стеков профиля name или None, если его нет."""
+    if not _NAME.match(name):
+        return None
+    path = _path(name, STACKS)
+    return path if os.path.isfile(path) else None
+
+
+class SamplingProfilerMiddleware:
+    """Снимает профиль запроса с подписанным заголовком X-Profile
+    или попавшего в выборку, включенную в админке.
+
+    Имя профиля возвращается в заголовке X-Profile-Capture.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def trigger(self, request):
+        token = request.META.get(HEADER)
+        if token and valid_token(token):
+            return 'header'
+        if sampled(request):
+            return 'sample'
+        return None
+
+    def __call__(self, request):
+        trigger = self.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        sampler = StackSampler(threading.get_ident(),
+                               settings.PROFILER_INTERVAL)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        user = getattr(request, 'user', None)
+        response['X-Profile-Capture'] = save_capture(sampler.stacks, {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view_name(request),
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            'samples': sampler.samples,
+            'interval_ms': settings.PROFILER_INTERVAL * 1000,
+            'trigger': trigger,
+            'user': (user.get_username()
+                     if user is not None and user.is_authenticated else ''),
+        })
+        return response
@@ -0,0 +1,206 @@
+"""Журнал медленных SQL-запросов.
+
+Запрос дольше SLOW_QUERY_THRESHOLD_MS попадает в лог core.slow_queries
+и в журнал процесса: SQL, представление, строка кода проекта и строка
+шаблона, из которых он выполнен, и план запроса (EXPLAIN QUERY PLAN
+в SQLite, EXPLAIN в других СУБД). Одинаковые запросы складываются,
+в журнале остаются SLOW_QUERY_TOP_N запросов с наибольшим суммарным
+временем. Журнал показывает /admin/slow-queries/.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+from .profiling import view_name
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def _template_origin(frame):
+    # Ближайший к запросу узел шаблона: тег или переменная, при
+    # выводе которых выполнился запрос.
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if isinstance(node, Node) and origin and token:
+                name = origin.template_name or origin.name
+                return f'{name}:{token.lineno}'
+        frame = frame.f_back
+    return ''
+
+
+def _code_origin(frame):
+    # Ближайшая строка кода проекта, не считая этого модуля.
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(settings.BASE_DIR) and path != __file__:
+            return (f'{os.path.relpath(path, settings.BASE_DIR)}:'
+                    f'{frame.f_lineno} ({frame.f_code.co_name})')
+        frame = frame.f_back
+    return ''
+
+
+def _format_plan(vendor, rows):
+    if vendor != 'sqlite':
+        return '\n'.join(str(row[0]) for row in rows)
+    # Строки EXPLAIN QUERY PLAN: (id, parent, notused, detail).
+    depths, lines = {}, []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+    return '\n'.join(lines)
+
+
+def explain(connection, sql, params):
+    """План запроса sql или текст ошибки, если EXPLAIN не выполнился.
+
+    Курсор драйвера, а не Django: EXPLAIN не проходит через обертки
+    выполнения и не попадает в счетчики запросов.
+    """
+    prefix = ('EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+              else 'EXPLAIN ')
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    except connection.Database.Error as error:
+        return f'EXPLAIN не выполнен: {error}'
+    finally:
+        cursor.close()
+    return _format_plan(connection.vendor, rows)
+
+
+class SlowQueryLog:
+    """Медленные запросы процесса, сложенные по тексту SQL.
+
+    Хранит не больше SLOW_QUERY_TOP_N запросов: новый запрос вытесняет
+    запрос с наименьшим суммарным временем, если сам дольше его.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def has_plan(self, sql):
+        with self._lock:
+            entry = self._entries.get(sql)
+            return entry is not None and entry['plan'] is not None
+
+    def _make_room(self, duration_ms):
+        if len(self._entries) < settings.SLOW_QUERY_TOP_N:
+            return True
+        smallest = min(self._entries.values(),
+                       key=lambda entry: entry['total_ms'])
+        if smallest['total_ms'] >= duration_ms:
+            return False
+        del self._entries[smallest['sql']]
+        return True
+
+    def add(self, sql, duration_ms, params='', view='', code='',
+            template='', plan=None):
+        with self._lock:
+            entry = self._entries.get(sql)
+            if entry is None:
+                if not self._make_room(duration_ms):
+                    return
+                entry = self._entries[sql] = {
+                    'sql': sql, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'views': Counter(), 'plan': None,
+                }
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['views'][view] += 1
+            entry['last_seen'] = datetime.now().isoformat(timespec='seconds')
+            if plan is not None:
+                entry['plan'] = plan
+            if duration_ms >= entry['max_ms']:
+                # Параметры и место вызова — самого долгого выполнения.
+                entry.update(max_ms=duration_ms, params=params, code=code,
+                             template=template)
+
+    def snapshot(self):
+        """Записи по убыванию суммарного времени."""
+        with self._lock:
+            entries = [{**entry, 'views': dict(entry['views'])}
+                       for entry in self._entries.values()]
+        return sorted(entries, key=lambda entry: entry['total_ms'],
+                      reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_log = SlowQueryLog()
+
+
+def _record(connection, sql, params, many, duration_ms):
+    frame = sys._getframe()
+    request = getattr(_local, 'request', None)
+    view = view_name(request) if request is not None else ''
+    code, template = _code_origin(frame), _template_origin(frame)
+    frame = None
+    plan = None
+    if (not many and not slow_log.has_plan(sql)
+            and sql.lstrip()[:6].upper() in ('SELECT', 'WITH')):
+        plan = explain(connection, sql, params)
+    slow_log.add(sql, duration_ms, repr(params), view, code, template,
+                 plan)
+    logger.warning(json.dumps({
+        'sql': sql, 'ms': round(duration_ms, 3), 'view': view,
+        'code': code, 'template': template,
+    }, ensure_ascii=False))
+
+
+def _execute(execute, sql, params, many, context):
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold_ms is not None and duration_ms >= threshold_ms:
+        _record(context['connection'], sql, params, many, duration_ms)
+    return result
+
+
+@contextmanager
+def watch(request=None):
+    """Записывает медленные запросы всех соединений внутри блока."""
+    _local.request = request
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_execute))
+            yield
+    finally:
+        _local.request = None
+
+
+class SlowQueryMiddleware:
+    """Ищет медленные запросы в каждом запросе к сайту.
+
+    Быстрые запросы стоят двух замеров времени; SLOW_QUERY_THRESHOLD_MS
+    = None выключает проверку.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            return self.get_response(request)
+        with watch(request):
+            return self.get_response(request)
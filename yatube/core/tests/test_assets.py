@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+from wsgiref.util import FileWrapper, setup_testing_defaults
+
+from django.conf import settings
+from django.test import SimpleTestCase
+from django.utils.http import http_date
+
+from ..assets import HASHED_MEDIA, HASHED_STATIC, IMMUTABLE, AssetServer
+
+TEMP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+HASHED_NAME = 'posts/ab/' + 'ab' * 32 + '.jpg'
+
+
+def django_app(environ, start_response):
+    raise AssertionError('Запрос к файлу дошел до Django')
+
+
+class AssetServerTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('plain.txt', HASHED_NAME):
+            path = os.path.join(TEMP_ROOT, 'media', name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+        cls.app = AssetServer(django_app, (
+            ('/static/', os.path.join(TEMP_ROOT, 'static'), HASHED_STATIC),
+            ('/media/', os.path.join(TEMP_ROOT, 'media'), HASHED_MEDIA),
+        ))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_ROOT, ignore_errors=True)
+
+    def get(self, path, **headers):
+        environ = {'PATH_INFO': path, 'wsgi.file_wrapper': FileWrapper}
+        environ.update(
+            (f'HTTP_{name.upper()}', value) for name, value in headers.items()
+        )
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = int(status.split()[0])
+            response['headers'] = dict(headers)
+
+        body = self.app(environ, start_response)
+        response['body'] = b''.join(body)
+        if hasattr(body, 'close'):
+            body.close()
+        return response
+
+    def test_serves_files_without_django(self):
+        """Файл отдается целиком с валидаторами кэша."""
+        response = self.get('/media/plain.txt')
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(response['body'], CONTENT)
+        headers = response['headers']
+        self.assertEqual(headers['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(headers['Content-Type'], 'text/plain')
+        self.assertEqual(headers['Cache-Control'], 'no-cache')
+        self.assertIn('ETag', headers)
+        self.assertIn('Last-Modified', headers)
+
+    def test_content_addressed_files_are_immutable(self):
+        response = self.get('/media/' + HASHED_NAME)
+        self.assertEqual(response['headers']['Cache-Control'], IMMUTABLE)
+
+    def test_conditional_requests(self):
+        """Неизмененный файл отдается ответом 304 без тела."""
+        etag = self.get('/media/plain.txt')['headers']['ETag']
+        for headers in ({'if_none_match': etag},
+                        {'if_modified_since': http_date()}):
+            with self.subTest(headers=headers):
+                response = self.get('/media/plain.txt', **headers)
+                self.assertEqual(response['status'], 304)
+                self.assertEqual(response['body'], b'')
+        response = self.get('/media/plain.txt', if_none_match='"other"')
+        self.assertEqual(response['status'], 200)
+
+    def test_range_requests(self):
+        cases = (
+            ('bytes=10-19', 206, CONTENT[10:20], 'bytes 10-19/1024'),
+            ('bytes=1000-', 206, CONTENT[1000:], 'bytes 1000-1023/1024'),
+            ('bytes=-4', 206, CONTENT[-4:], 'bytes 1020-1023/1024'),
+            ('bytes=2000-', 416, b'', 'bytes */1024'),
+            ('bytes=-0', 416, b'', 'bytes */1024'),
+        )
+        for byte_range, status, body, content_range in cases:
+            with self.subTest(byte_range=byte_range):
+                response = self.get('/media/plain.txt', range=byte_range)
+                self.assertEqual(response['status'], status)
+                self.assertEqual(response['body'], body)
+                self.assertEqual(response['headers']['Content-Range'],
+                                 content_range)
+
+    def test_unsupported_ranges_are_ignored(self):
+        """Непонятный Range — весь файл, а не 416 (RFC 7233)."""
+        for byte_range in ('bytes=0-1,4-5', 'items=0-1', 'bytes=5-3',
+                           'bytes=-'):
+            with self.subTest(byte_range=byte_range):
+                response = self.get('/media/plain.txt', range=byte_range)
+                self.assertEqual(response['status'], 200)
+                self.assertEqual(response['body'], CONTENT)
+                self.assertNotIn('Content-Range', response['headers'])
+
+    def test_hidden_files_are_not_served(self):
+        for name in ('.lock', 'posts/.reserved.json'):
+            path = os.path.join(TEMP_ROOT, 'media', name)
+            with open(path, 'w') as file:
+                file.write('{}')
+            with self.subTest(name=name):
+                self.assertEqual(self.get('/media/' + name)['status'], 404)
+
+    def test_files_outside_root_are_not_served(self):
+        for path in ('/media/../media/missing.txt', '/media/../../etc/passwd',
+                     '/media/posts'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path)['status'], 404)
+
+    def test_other_paths_go_to_django(self):
+        with self.assertRaisesMessage(AssertionError, 'до Django'):
+            self.get('/posts/1/')
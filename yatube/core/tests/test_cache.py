@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import NearCache
+
+TEMP_CACHE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SHARED_ALIAS = 'near_cache_test'
+
+
+def near_cache(**options):
+    """Отдельный экземпляр — как ближний кэш отдельного воркера."""
+    options.setdefault('SHARED_ALIAS', SHARED_ALIAS)
+    return NearCache('', {'OPTIONS': options})
+
+
+# Файловый кэш заменяет общий кэш воркеров (memcached, redis).
+@override_settings(CACHES={
+    **settings.CACHES,
+    SHARED_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    },
+})
+class NearCacheTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def tearDown(self):
+        near_cache().clear()
+
+    def test_workers_share_values(self):
+        """Запись одного воркера видна другому через общий кэш."""
+        first, second = near_cache(), near_cache()
+        first.set('key', 'value')
+        self.assertEqual(second.get('key'), 'value')
+        first.set('counter', 1)
+        self.assertEqual(first.incr('counter'), 2)
+        self.assertEqual(second.get('counter'), 2)
+
+    def test_local_level_answers_without_shared(self):
+        """Повторное чтение берется из памяти процесса."""
+        worker = near_cache()
+        worker.set('key', 'value')
+        worker.shared.clear()
+        self.assertEqual(worker.get('key'), 'value')
+        self.assertIsNone(near_cache().get('key'))
+
+    def test_local_copy_expires(self):
+        """Чужое изменение видно не позже LOCAL_TIMEOUT."""
+        first = near_cache(LOCAL_TIMEOUT=0.05)
+        first.set('key', 'old')
+        near_cache().set('key', 'new')
+        self.assertEqual(first.get('key'), 'old')
+        time.sleep(0.1)
+        self.assertEqual(first.get('key'), 'new')
+
+    def test_local_level_is_bounded(self):
+        """Ближний кэш вытесняет давно не читанные записи."""
+        worker = near_cache(MAX_ENTRIES=3, MAX_BYTES=1024)
+        for i in range(10):
+            worker.set(f'key{i}', i)
+            worker.get('key0')
+        self.assertEqual(len(worker._local), 3)
+        self.assertIn(worker.make_key('key0'), worker._local)
+        worker.set('big', 'x' * 2048)
+        self.assertNotIn(worker.make_key('big'), worker._local)
+        self.assertLessEqual(worker._local_bytes, 1024)
+        self.assertEqual(worker.get('big'), 'x' * 2048)
+
+    def test_get_or_set_computes_once(self):
+        """Одновременные промахи в одном процессе считают значение раз."""
+        worker = near_cache()
+        calls = []
+        results = []
+        start = threading.Barrier(8)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        def read():
+            start.wait()
+            results.append(worker.get_or_set('key', compute))
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
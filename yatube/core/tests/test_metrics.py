@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+
+User = get_user_model()
+
+
+def sample(text, line):
+    """Значение строки line из вывода /metrics."""
+    for row in text.splitlines():
+        if row.startswith(line + ' '):
+            return float(row.rsplit(' ', 1)[1])
+    return 0.0
+
+
+class RegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.counter = metrics.counter('test_events_total', 'События.',
+                                       ('kind',))
+        self.histogram = metrics.histogram('test_seconds', 'Время.',
+                                           buckets=(0.1, 1.0))
+        self.counter.values.clear()
+        self.histogram.values.clear()
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_text_format(self):
+        self.counter.inc(kind='a "b"')
+        self.counter.inc(2, kind='a "b"')
+        for value in (0.05, 0.1, 0.5, 3):
+            self.histogram.observe(value)
+        text = metrics.render()
+        self.assertIn('# TYPE test_events_total counter', text)
+        self.assertIn('test_events_total{kind="a \\"b\\""} 3', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('test_seconds_bucket{le="1.0"} 3', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn('test_seconds_count 4', text)
+        self.assertEqual(sample(text, 'test_seconds_sum'), 3.65)
+
+    def test_values_are_summed_across_workers(self):
+        """/metrics складывает файлы всех воркеров из METRICS_DIR."""
+        with override_settings(METRICS_DIR=self.directory):
+            self.counter.inc(kind='x')
+            self.histogram.observe(0.5)
+            # Файл другого воркера.
+            with open(os.path.join(self.directory, '1-other.json'),
+                      'w') as stream:
+                json.dump({
+                    'test_events_total': [[['x'], 4]],
+                    'test_seconds': [[[], [1, 0, 0, 0.01]]],
+                }, stream)
+            text = metrics.render()
+        self.assertIn('test_events_total{kind="x"} 5', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_seconds_count 2', text)
+
+    def test_files_of_dead_workers_are_merged(self):
+        def write(file_name, count):
+            with open(os.path.join(self.directory, file_name),
+                      'w') as stream:
+                json.dump({'test_events_total': [[['x'], count]]}, stream)
+
+        alive = {os.getpid(), 1}
+        with override_settings(METRICS_DIR=self.directory), mock.patch(
+            'core.metrics._alive', side_effect=lambda pid: pid in alive
+        ):
+            write('1-alive.json', 1)
+            write('999998-dead.json', 2)
+            write('999999-dead.json', 4)
+            text = metrics.render()
+            self.assertIn('test_events_total{kind="x"} 7', text)
+            self.assertEqual(
+                sorted(name for name in os.listdir(self.directory)
+                       if name.endswith('.json')
+                       and not name.startswith(str(os.getpid()))),
+                ['1-alive.json', metrics.ARCHIVE],
+            )
+            write('999997-dead.json', 8)
+            text = metrics.render()
+        self.assertIn('test_events_total{kind="x"} 15', text)
+
+    def test_write_errors_do_not_fail_callers(self):
+        """Недоступный METRICS_DIR — запись в лог, а не исключение."""
+        blocker = os.path.join(self.directory, 'file')
+        open(blocker, 'w').close()
+        with override_settings(METRICS_DIR=os.path.join(blocker, 'metrics'),
+                               METRICS_FLUSH_INTERVAL=0):
+            with self.assertLogs('core.metrics', 'WARNING'):
+                self.counter.inc(kind='x')
+            with self.assertLogs('core.metrics', 'WARNING'):
+                text = metrics.render()
+        self.assertIn('# TYPE test_events_total counter', text)
+
+
+class MetricsEndpointTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth',
+                                            password='password')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def metrics_text(self):
+        return self.client.get(reverse('metrics')).content.decode()
+
+    def test_page_cache_and_views_are_counted(self):
+        before = self.metrics_text()
+        for _ in range(2):
+            self.client.get(reverse('posts:index'))
+        after = self.metrics_text()
+        for line, delta in (
+            ('yatube_page_cache_requests_total'
+             '{page="index_page",result="miss"}', 1),
+            ('yatube_page_cache_requests_total'
+             '{page="index_page",result="hit"}', 1),
+            ('yatube_http_requests_total'
+             '{view="posts:index",method="GET",status="200"}', 2),
+            ('yatube_http_request_duration_seconds_count'
+             '{view="posts:index"}', 2),
+        ):
+            with self.subTest(line=line):
+                self.assertEqual(sample(after, line) - sample(before, line),
+                                 delta)
+
+    def test_auth_events_are_counted(self):
+        before = self.metrics_text()
+        self.client.login(username='auth', password='wrong')
+        self.client.login(username='auth', password='password')
+        after = self.metrics_text()
+        for event in ('login', 'login_failed'):
+            line = f'yatube_auth_events_total{{event="{event}"}}'
+            with self.subTest(event=event):
+                self.assertEqual(sample(after, line) - sample(before, line),
+                                 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code,
+                         401)
+        response = self.client.get(reverse('metrics'),
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,97 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..profiling import Profile, stats
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        stats.clear()
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_server_timing_and_log(self):
+        """Замеры запроса уходят в Server-Timing и в лог одной строкой."""
+        self.client.force_login(User.objects.create_user(
+            username='staff', is_staff=True
+        ))
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('total;dur=', 'sql;dur=', 'tpl;dur=',
+                       'cache-default;desc='):
+            self.assertIn(metric, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertGreater(record['sql_queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache']['default']['misses'], 0)
+
+    def test_cache_hits_are_counted(self):
+        """Повторный запрос отвечает из кэша, и это видно в замерах."""
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+            self.client.get(reverse('posts:index'))
+        second = json.loads(logs.records[1].getMessage())
+        self.assertGreater(second['cache']['default']['hits'], 0)
+        self.assertEqual(second['template_ms'], 0)
+
+    def test_server_timing_is_hidden_from_visitors(self):
+        """Посетителям Server-Timing не отдается, замеры идут в лог."""
+        self.client.force_login(self.user)
+        for client in (Client(), self.client):
+            with self.assertLogs('core.profiling', 'INFO'):
+                response = client.get(reverse('posts:index'))
+            self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_profiled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_stats_endpoint(self):
+        """Суммы по представлениям доступны только персоналу."""
+        with self.assertLogs('core.profiling', 'INFO'):
+            self.client.get(reverse('posts:index'))
+            anonymous = self.client.get(reverse('profiling_stats'))
+        self.assertEqual(anonymous.status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        with self.assertLogs('core.profiling', 'INFO'):
+            views = self.client.get(reverse('profiling_stats')).json()[
+                'views'
+            ]
+        self.assertEqual(views['posts:index']['requests'], 1)
+
+
+class ProfileTests(TestCase):
+    def test_duplicate_queries(self):
+        """Повтор того же запроса — дубликат, другие параметры — похожий."""
+        profile = Profile()
+        with connection.execute_wrapper(profile.query):
+            for pk in (1, 1, 2):
+                list(User.objects.filter(pk=pk))
+        self.assertEqual(
+            (profile.queries, profile.duplicates, profile.similar),
+            (3, 1, 2),
+        )
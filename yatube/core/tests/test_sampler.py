@@ -0,0 +1,155 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import sampler
+
+User = get_user_model()
+
+
+def busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class StackSamplerTests(TestCase):
+    def test_samples_other_thread(self):
+        """Снимки стека потока складываются в свернутые стеки."""
+        stop = threading.Event()
+        worker = threading.Thread(target=busy, args=(stop,))
+        worker.start()
+        stack_sampler = sampler.StackSampler(worker.ident, 0.001)
+        stack_sampler.start()
+        time.sleep(0.05)
+        stack_sampler.stop()
+        stop.set()
+        worker.join()
+        self.assertGreater(stack_sampler.samples, 0)
+        stack = max(stack_sampler.stacks, key=stack_sampler.stacks.get)
+        self.assertTrue(stack.startswith('threading:'))
+        self.assertIn(f'{__name__}:busy', stack.split(';'))
+
+
+class SamplingProfilerMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.profiler_settings = override_settings(
+            PROFILER_DIR=self.directory, PROFILER_INTERVAL=0.001
+        )
+        self.profiler_settings.enable()
+        self.client = Client()
+        self.url = reverse('about:author')
+
+    def tearDown(self):
+        self.profiler_settings.disable()
+        shutil.rmtree(self.directory)
+        cache.clear()
+
+    def test_signed_header_captures_request(self):
+        """Запрос с подписанным X-Profile сохраняется в PROFILER_DIR."""
+        response = self.client.get(self.url,
+                                   HTTP_X_PROFILE=sampler.make_token())
+        name = response['X-Profile-Capture']
+        [capture] = sampler.list_captures()
+        self.assertEqual(capture['name'], name)
+        self.assertEqual(
+            (capture['path'], capture['view'], capture['status'],
+             capture['trigger']),
+            (self.url, 'about:author', 200, 'header'),
+        )
+        with open(sampler.stacks_path(name), encoding='utf-8') as stream:
+            lines = stream.read().splitlines()
+        self.assertEqual(len(lines), len(set(lines)))
+        self.assertEqual(
+            sum(int(line.rsplit(' ', 1)[1]) for line in lines),
+            capture['samples'],
+        )
+
+    def test_bad_or_expired_token_is_ignored(self):
+        """Неверный или просроченный токен не включает профилирование."""
+        response = self.client.get(self.url, HTTP_X_PROFILE='profile:x:y')
+        self.assertNotIn('X-Profile-Capture', response)
+        with override_settings(PROFILER_TOKEN_MAX_AGE=-1):
+            response = self.client.get(self.url,
+                                       HTTP_X_PROFILE=sampler.make_token())
+        self.assertNotIn('X-Profile-Capture', response)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_admin_toggle(self):
+        """Выборка из админки профилирует запросы с заданным путем."""
+        self.client.force_login(self.admin)
+        page = reverse('profiler_captures')
+        self.client.post(page, {'sample_rate': 1, 'minutes': 5,
+                                'path_prefix': '/about/'})
+        self.assertIn('X-Profile-Capture', self.client.get(self.url))
+        self.assertNotIn('X-Profile-Capture',
+                         self.client.get(reverse('posts:index')))
+        self.client.post(page, {'disable': 'on'})
+        self.assertNotIn('X-Profile-Capture', self.client.get(self.url))
+        self.assertEqual(
+            [capture['trigger'] for capture in sampler.list_captures()],
+            ['sample'],
+        )
+
+    def test_toggle_is_shared_through_file(self):
+        """Выборку видит и другой процесс с тем же PROFILER_DIR."""
+        self.assertEqual(sampler.get_toggle(), sampler.OFF)
+        sampler.enable(0.5, 5, '/about/')
+        # Другой процесс: своего прочитанного значения у него нет.
+        sampler._toggles.clear()
+        toggle = sampler.get_toggle()
+        self.assertEqual((toggle['sample_rate'], toggle['path_prefix']),
+                         (0.5, '/about/'))
+        sampler.disable()
+        self.assertEqual(sampler.get_toggle(), sampler.OFF)
+        self.assertEqual(sampler.list_captures(), [])
+
+    def test_admin_page_lists_and_downloads_captures(self):
+        """Профили видны в админке и скачиваются файлом."""
+        response = self.client.get(self.url,
+                                   HTTP_X_PROFILE=sampler.make_token())
+        name = response['X-Profile-Capture']
+        page = reverse('profiler_captures')
+        download = reverse('profiler_capture', kwargs={'name': name})
+        self.assertRedirects(self.client.get(page),
+                             f'{reverse("admin:login")}?next={page}')
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get(reverse('admin:index')), page)
+        self.assertContains(self.client.get(page), download)
+        response = self.client.get(download)
+        with open(sampler.stacks_path(name), 'rb') as stream:
+            self.assertEqual(b''.join(response.streaming_content),
+                             stream.read())
+        self.assertEqual(
+            self.client.get(reverse('profiler_capture',
+                                    kwargs={'name': '..'})).status_code,
+            404,
+        )
+
+    @override_settings(PROFILER_MAX_CAPTURES=2)
+    def test_old_captures_are_pruned(self):
+        """В каталоге остаются PROFILER_MAX_CAPTURES последних профилей."""
+        names = [sampler.save_capture({'a;b': 1}, {}) for _ in range(3)]
+        self.assertEqual(
+            [capture['name'] for capture in sampler.list_captures()],
+            names[:0:-1],
+        )
+        with open(os.path.join(self.directory,
+                               names[-1] + sampler.META)) as stream:
+            self.assertEqual(json.load(stream), {'name': names[-1]})
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..slow_queries import slow_log, watch
+
+User = get_user_model()
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class SlowQueryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        slow_log.clear()
+
+    def tearDown(self):
+        slow_log.clear()
+
+    def entry(self, table):
+        for entry in slow_log.snapshot():
+            if entry['sql'].startswith('SELECT') and table in entry['sql']:
+                return entry
+        self.fail(f'нет запроса к {table}')
+
+    def test_query_origin_and_plan(self):
+        """Запись знает представление, строку кода и план запроса."""
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            Client().get(reverse('posts:profile',
+                                 kwargs={'username': self.user.username}))
+        entries = slow_log.snapshot()
+        self.assertEqual({view for entry in entries
+                          for view in entry['views']}, {'posts:profile'})
+        self.assertTrue(any(
+            entry['code'].startswith('posts/views.py:')
+            and entry['code'].endswith('(profile)') for entry in entries
+        ))
+        self.assertIn('posts_post', self.entry('"posts_post"')['plan'])
+
+    def test_template_line(self):
+        """Запрос, выполненный при выводе шаблона, знает строку шаблона."""
+        template = Template('{% load static %}\n\n'
+                            '{% for post in posts %}{{ post.text }}'
+                            '{% endfor %}')
+        with self.assertLogs('core.slow_queries', 'WARNING'), watch():
+            template.render(Context({'posts': Post.objects.all()}))
+        self.assertTrue(self.entry('posts_post')['template'].endswith(':3'))
+
+    def test_explain_is_not_counted_and_runs_once(self):
+        """EXPLAIN не входит в счетчик запросов и делается один раз."""
+        with self.assertLogs('core.slow_queries', 'WARNING'), watch():
+            with CaptureQueriesContext(connection) as queries:
+                list(Post.objects.all())
+                list(Post.objects.all())
+        self.assertEqual(len(queries), 2)
+        entry = self.entry('posts_post')
+        self.assertEqual(entry['count'], 2)
+        self.assertTrue(entry['plan'])
+        self.assertFalse(any(entry['sql'].startswith('EXPLAIN')
+                             for entry in slow_log.snapshot()))
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=10 ** 6)
+    def test_fast_queries_are_skipped(self):
+        with watch():
+            list(Post.objects.all())
+        self.assertEqual(slow_log.snapshot(), [])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_disabled(self):
+        """None выключает журнал и в watch(), и в middleware."""
+        with watch():
+            list(Post.objects.all())
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(slow_log.snapshot(), [])
+
+    @override_settings(SLOW_QUERY_TOP_N=2)
+    def test_keeps_top_by_total_time(self):
+        """Журнал хранит запросы с наибольшим суммарным временем."""
+        slow_log.add('a', 5)
+        slow_log.add('b', 3)
+        slow_log.add('c', 1)
+        slow_log.add('c', 1)
+        slow_log.add('b', 3)
+        slow_log.add('d', 4)
+        self.assertEqual(
+            [(entry['sql'], entry['total_ms'])
+             for entry in slow_log.snapshot()],
+            [('b', 6), ('a', 5)],
+        )
+
+    def test_admin_page(self):
+        """Журнал виден сотрудникам в админке и очищается оттуда."""
+        slow_log.add('SELECT 1', 150, plan='SCAN posts_post')
+        url = reverse('slow_queries')
+        client = Client()
+        self.assertRedirects(client.get(url),
+                             f'{reverse("admin:login")}?next={url}')
+        client.force_login(User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        ))
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            self.assertContains(client.get(reverse('admin:index')), url)
+            self.assertContains(client.get(url), 'SCAN posts_post')
+            client.post(url)
+        self.assertNotIn('SELECT 1',
+                         [entry['sql'] for entry in slow_log.snapshot()])
@@ -1,7 +1,23 @@
 # core/views.py
-from django.shortcuts import render
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.shortcuts import redirect, render
 from http import HTTPStatus
 
+from . import metrics as registry
+from . import sampler
+from .forms import ProfilerToggleForm
+from .profiling import stats
+from .slow_queries import slow_log
+
+CAPTURES_PER_PAGE = 50
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path},
@@ -10,3 +26,78 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def profiling_stats(request):
+    """Суммы замеров ProfilingMiddleware по представлениям."""
+    return JsonResponse({
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'views': stats.snapshot(),
+    })
+
+
+def metrics(request):
+    """Метрики всех воркеров в текстовом формате Prometheus.
+
+    Если задан METRICS_TOKEN, сборщик передает его в заголовке
+    Authorization: Bearer <токен>.
+    """
+    if settings.METRICS_TOKEN and not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {settings.METRICS_TOKEN}',
+    ):
+        return HttpResponse(status=HTTPStatus.UNAUTHORIZED)
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
+
+
+@staff_member_required
+def profiler_captures(request):
+    """Профили запросов и выборка для профилирования (core.sampler)."""
+    form = ProfilerToggleForm(request.POST or None)
+    if request.method == 'POST':
+        if 'disable' in request.POST:
+            sampler.disable()
+            return redirect('profiler_captures')
+        if form.is_valid():
+            sampler.enable(**form.cleaned_data)
+            return redirect('profiler_captures')
+    toggle = sampler.get_toggle()
+    paginator = Paginator(sampler.list_captures(), CAPTURES_PER_PAGE)
+    return render(request, 'core/profiler.html', {
+        **admin.site.each_context(request),
+        'form': form,
+        'toggle': toggle,
+        'enabled_until': (datetime.fromtimestamp(toggle['until'])
+                          if toggle['until'] > datetime.now().timestamp()
+                          else None),
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'title': 'Профили запросов',
+    })
+
+
+@staff_member_required
+def profiler_capture(request, name):
+    """Файл стеков профиля для flamegraph.pl или speedscope."""
+    path = sampler.stacks_path(name)
+    if path is None:
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True,
+                        filename=f'{name}{sampler.STACKS}',
+                        content_type='text/plain; charset=utf-8')
+
+
+@staff_member_required
+def slow_queries(request):
+    """Медленные SQL-запросы этого процесса (core.slow_queries)."""
+    if request.method == 'POST':
+        slow_log.clear()
+        return redirect('slow_queries')
+    return render(request, 'core/slow_queries.html', {
+        **admin.site.each_context(request),
+        'entries': slow_log.snapshot(),
+        'threshold_ms': settings.SLOW_QUERY_THRESHOLD_MS,
+        'title': 'Медленные запросы',
+    })
@@ -1,19 +1,189 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from django.utils.html import format_html
 
-from .models import Post, Group, Follow
+from . import jobs
+from .counters import get_post_count
+from .models import BulkJob, Post, Group, Follow
+from .paginators import EstimatedCountPaginator
+from .search import search_post_ids
+
+# Сколько самых релевантных постов показывает поиск в админке.
+ADMIN_SEARCH_LIMIT = 1000
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое подписывает выбранное значение уже
+    загруженным объектом (list_select_related), а не запросом на строку.
+    """
+    loaded = ()
+
+    def optgroups(self, name, value, attr=None):
+        if not self.loaded:
+            return super().optgroups(name, value, attr)
+        default = (None, [], 0)
+        selected_choices = {
+            str(v) for v in value
+            if str(v) not in self.choices.field.empty_values
+        }
+        if not self.is_required and not self.allow_multiple_selected:
+            default[1].append(self.create_option(name, '', '', False, 0))
+        for obj in self.loaded:
+            if str(obj.pk) in selected_choices:
+                default[1].append(self.create_option(
+                    name, obj.pk, self.choices.field.label_from_instance(obj),
+                    selected_choices, len(default[1]),
+                ))
+        return [default]
+
+
+class LoadedRelationsForm(forms.ModelForm):
+    """Форма строки списка: отдает виджетам связанные объекты строки."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            model_field = self.instance._meta.get_field(name)
+            if (isinstance(widget, LoadedAutocompleteSelect)
+                    and model_field.is_cached(self.instance)):
+                related = getattr(self.instance, name)
+                widget.loaded = (related,) if related else ()
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        widget=AutocompleteSelect(Post._meta.get_field('group').remote_field,
+                                  admin.site),
+    )
 
 
 class PostAdmin(admin.ModelAdmin):
     # Перечисляем поля, которые должны отображаться в админке
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
+    # Автор и группа строки берутся одним запросом со списком
+    list_select_related = ('author', 'group')
+    # Вместо <select> со всеми группами и авторами в каждой строке —
+    # поле с подгрузкой вариантов по мере ввода
+    autocomplete_fields = ('author', 'group')
     # Добавляем интерфейс для поиска по тексту постов
     search_fields = ('text',)
-    # Добавляем возможность фильтрации по дате
+    # Добавляем возможность фильтрации по дате; фильтр и навигация
+    # по дате опираются на индекс pub_date
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    ordering = ('-pub_date', '-pk')
+    paginator = EstimatedCountPaginator
+    # Не считаем COUNT(*) по всей таблице ради «показать все»
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    # Массовые действия выполняются фоновыми заданиями (posts.jobs)
+    action_form = PostActionForm
+    actions = ('delete_in_background', 'move_to_group')
+
+    def get_actions(self, request):
+        # Стандартное удаление выполняется в запросе целиком.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def _enqueue(self, request, queryset, action, group=None):
+        job = jobs.enqueue(
+            action,
+            queryset.order_by().values_list('pk', flat=True).iterator(),
+            user=request.user,
+            group=group,
+        )
+        url = reverse('admin:posts_bulkjob_change', args=(job.pk,))
+        self.message_user(request, format_html(
+            'Задание <a href="{}">{}</a> поставлено в очередь: {} постов.',
+            url, job, job.total,
+        ))
+
+    def delete_in_background(self, request, queryset):
+        self._enqueue(request, queryset, BulkJob.DELETE)
+    delete_in_background.short_description = 'Удалить выбранные посты'
+    delete_in_background.allowed_permissions = ('delete',)
+
+    def move_to_group(self, request, queryset):
+        try:
+            group = self.action_form.base_fields['group'].clean(
+                request.POST.get('group')
+            )
+        except ValidationError:
+            self.message_user(request, 'Такой группы нет.', messages.ERROR)
+            return
+        self._enqueue(request, queryset, BulkJob.SET_GROUP, group)
+    move_to_group.short_description = 'Перенести выбранные посты в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = LoadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', LoadedRelationsForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return self.paginator(queryset, per_page, orphans,
+                              allow_empty_first_page,
+                              get_count=get_post_count)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE по всей таблице."""
+        if not search_term.strip():
+            return queryset, False
+        post_ids = search_post_ids(search_term, ADMIN_SEARCH_LIMIT)
+        return queryset.filter(pk__in=post_ids), False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
+
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+
+
+class BulkJobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'action', 'status', 'progress_display', 'group',
+                    'user', 'created', 'updated')
+    list_filter = ('status', 'action')
+    list_select_related = ('group', 'user')
+    fields = ('action', 'status', 'progress_display', 'done', 'total',
+              'group', 'user', 'error', 'created', 'updated')
+    readonly_fields = fields
+
+    def progress_display(self, job):
+        return f'{job.progress}%'
+    progress_display.short_description = 'Прогресс'
+
+    def has_add_permission(self, request):
+        # Задания создаются действиями в списке постов.
+        return False
+
+    def has_change_permission(self, request, job=None):
+        return False
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Follow)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(BulkJob, BulkJobAdmin)
@@ -0,0 +1,305 @@
+import json
+import os
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .fake_data import PASSWORD
+from .models import Comment, Follow, Group, Post, User
+
+# Сценарий: запрос к одному URL из posts.urls. user — от чьего имени
+# (None — аноним), setup — подготовка перед каждым повтором, не входит
+# в замер (например, подписка перед замером отписки).
+Scenario = namedtuple('Scenario', 'name url_name method user path data setup')
+
+PERCENTILES = (50, 95, 99)
+
+
+def _scenario(name, url_name, method='get', user=None, kwargs=None,
+              query='', data=None, setup=None):
+    path = reverse(url_name, kwargs=kwargs) + query
+    return Scenario(name, url_name, method, user, path, data, setup)
+
+
+def build_scenarios():
+    """Сценарии для всех URL posts.urls на данных из базы.
+
+    Берутся самые нагруженные объекты: автор с наибольшим числом
+    постов, пост с наибольшим числом комментариев, самая большая
+    группа и читатель с наибольшим числом подписок.
+    """
+    author = User.objects.annotate(
+        posts_count=Count('posts')
+    ).order_by('-posts_count', 'pk').first()
+    reader = User.objects.annotate(
+        follows_count=Count('follower')
+    ).exclude(pk=author.pk).order_by('-follows_count', 'pk').first()
+    post = Post.objects.annotate(
+        comments_count=Count('comments')
+    ).order_by('-comments_count', 'pk').first()
+    own_post = Post.objects.filter(author=author).order_by('pk').first()
+    group = Group.objects.annotate(
+        posts_count=Count('post')
+    ).order_by('-posts_count', 'pk').first()
+    word = max(post.text.split(), key=len)
+
+    def follow():
+        Follow.objects.get_or_create(user=reader, author=author)
+
+    scenarios = [
+        _scenario('index', 'posts:index'),
+        _scenario('index ?page=5', 'posts:index', query='?page=5'),
+        _scenario('profile', 'posts:profile',
+                  kwargs={'username': author.username}),
+        _scenario('post_detail', 'posts:post_detail',
+                  kwargs={'post_id': post.pk}),
+        _scenario('post_comments', 'posts:post_comments',
+                  kwargs={'post_id': post.pk}),
+        _scenario('search', 'posts:search',
+                  query='?' + urlencode({'q': word})),
+        _scenario('follow_index', 'posts:follow_index', user=reader),
+        _scenario('post_create (form)', 'posts:post_create', user=author),
+        _scenario('post_create', 'posts:post_create', 'post', author,
+                  data={'text': 'Пост из нагрузочного теста'}),
+        _scenario('post_edit (form)', 'posts:post_edit', user=author,
+                  kwargs={'post_id': own_post.pk}),
+        _scenario('post_edit', 'posts:post_edit', 'post', author,
+                  kwargs={'post_id': own_post.pk},
+                  data={'text': own_post.text}),
+        _scenario('add_comment', 'posts:add_comment', 'post', reader,
+                  kwargs={'post_id': post.pk},
+                  data={'text': 'Комментарий из нагрузочного теста'}),
+        _scenario('profile_follow', 'posts:profile_follow', user=reader,
+                  kwargs={'username': author.username}),
+        _scenario('profile_unfollow', 'posts:profile_unfollow',
+                  user=reader, kwargs={'username': author.username},
+                  setup=follow),
+    ]
+    if group is not None:
+        scenarios.insert(2, _scenario('group_list', 'posts:group_list',
+                                      kwargs={'slug': group.slug}))
+    return scenarios
+
+
+class ClientTarget:
+    """Запросы через тестовый клиент Django в этом же процессе.
+
+    Кроме времени ответа считает SQL-запросы на каждый запрос.
+    """
+    name = 'client'
+
+    def __init__(self):
+        self.clients = {}
+
+    def _client(self, user):
+        if user not in self.clients:
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            self.clients[user] = client
+        return self.clients[user]
+
+    def request(self, scenario):
+        client = self._client(scenario.user)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, scenario.method)(scenario.path,
+                                                        scenario.data)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(queries)
+
+
+class HttpTarget:
+    """Запросы по HTTP к запущенному серверу (runserver, gunicorn...).
+
+    Число SQL-запросов снаружи не видно и не считается.
+    """
+    name = 'http'
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.sessions = {}
+
+    def _session(self, user):
+        if user not in self.sessions:
+            session = requests.Session()
+            if user is not None:
+                login_url = self.base_url + reverse(settings.LOGIN_URL)
+                session.get(login_url)
+                session.post(login_url, {
+                    'username': user.username,
+                    'password': PASSWORD,
+                    'csrfmiddlewaretoken': session.cookies.get('csrftoken'),
+                }, headers={'Referer': login_url})
+            self.sessions[user] = session
+        return self.sessions[user]
+
+    def request(self, scenario):
+        session = self._session(scenario.user)
+        data = scenario.data
+        if scenario.method == 'post':
+            data = {**data,
+                    'csrfmiddlewaretoken': session.cookies.get('csrftoken')}
+        started = time.perf_counter()
+        response = session.request(
+            scenario.method, self.base_url + scenario.path, data=data,
+            headers={'Referer': self.base_url + scenario.path},
+            allow_redirects=False,
+        )
+        elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, None
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга; values отсортированы."""
+    rank = max(int(len(values) * percent / 100 + 0.5), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def run_scenario(target, scenario, iterations, warmup=1, cold=False,
+                 concurrency=1):
+    """Замеряет сценарий: перцентили времени ответа в мс, среднее
+    число SQL-запросов, пропускную способность и коды ответов.
+
+    cold — очищать кэш перед каждым запросом.
+    """
+    def once(_):
+        if scenario.setup is not None:
+            scenario.setup()
+        if cold:
+            cache.clear()
+        return target.request(scenario)
+
+    for i in range(warmup):
+        once(i)
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            samples = list(executor.map(once, range(iterations)))
+    else:
+        samples = [once(i) for i in range(iterations)]
+    wall_time = time.perf_counter() - started
+    latencies = sorted(elapsed * 1000 for _, elapsed, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    result = {
+        'url_name': scenario.url_name,
+        'path': scenario.path,
+        'requests': iterations,
+        'mean_ms': sum(latencies) / len(latencies),
+        'throughput_rps': iterations / wall_time,
+        'queries': sum(queries) / len(queries) if queries else None,
+        'statuses': sorted({status for status, _, _ in samples}),
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = percentile(latencies, percent)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def dataset_size():
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'follows': Follow.objects.count(),
+    }
+
+
+def run_benchmark(target, scenarios, iterations, warmup=1, cold=False,
+                  concurrency=1, progress=None):
+    # Размер данных до замера: сценарии записи его меняют.
+    dataset = dataset_size()
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = run_scenario(
+            target, scenario, iterations, warmup, cold, concurrency
+        )
+        if progress is not None:
+            progress(scenario.name, results[scenario.name])
+    return {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='microseconds'),
+        'target': target.name,
+        'iterations': iterations,
+        'cold_cache': cold,
+        'concurrency': concurrency,
+        'dataset': dataset,
+        'scenarios': results,
+    }
+
+
+def save_results(report, directory=None):
+    """Сохраняет отчет в BENCHMARK_DIR, возвращает путь к файлу."""
+    directory = directory or settings.BENCHMARK_DIR
+    os.makedirs(directory, exist_ok=True)
+    stamp = report['created'].replace(':', '').replace('-', '')
+    stamp = stamp.replace('.', '')
+    path = os.path.join(directory,
+                        f'{stamp}-{report["commit"] or "nogit"}.json')
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(report, stream, ensure_ascii=False, indent=2)
+    return path
+
+
+def latest_results(directory=None, exclude=None, target=None):
+    """Путь к последнему сохраненному отчету (кроме exclude) или None.
+
+    target — брать только отчеты с тем же способом запуска: время
+    ответа тестового клиента и HTTP-сервера сравнивать нельзя.
+    """
+    directory = directory or settings.BENCHMARK_DIR
+    if not os.path.isdir(directory):
+        return None
+    paths = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory)
+         if name.endswith('.json')),
+        reverse=True,
+    )
+    for path in paths:
+        if path == exclude:
+            continue
+        if target is None or load_results(path)['target'] == target:
+            return path
+    return None
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
+
+
+def compare(baseline, report, metric='p95_ms', threshold=0.1):
+    """Строки (сценарий, было, стало, изменение, регрессия)
+    для сценариев, которые есть в обоих отчетах."""
+    rows = []
+    for name, result in report['scenarios'].items():
+        old = baseline['scenarios'].get(name)
+        if old is None or old.get(metric) is None:
+            continue
+        before, after = old[metric], result[metric]
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change, change > threshold))
+    return rows
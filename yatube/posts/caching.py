@@ -0,0 +1,293 @@
+import hashlib
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from core import metrics
+
+ALL = 'all'
+AUTHOR = 'author'
+GROUP = 'group'
+POST = 'post'
+# Личные части страниц вошедшего пользователя (подписки).
+USER = 'user'
+
+# Пока один воркер пересчитывает значение, остальные отдают старое;
+# старое хранится STALE_TIMEOUT сверх срока жизни.
+STALE_TIMEOUT = 60
+RECOMPUTE_LOCK_TIMEOUT = 10
+RECOMPUTE_WAIT = 0.05
+
+PAGE_CACHE = metrics.counter(
+    'yatube_page_cache_requests_total',
+    'Запросы к кэшу страниц: hit, miss или bypass (не кэшируется).',
+    ('page', 'result'),
+)
+
+
+def _generation_key(scope, object_id):
+    return f'posts:generation:{scope}:{object_id}'
+
+
+def _changed_key(scope, object_id):
+    return f'posts:changed:{scope}:{object_id}'
+
+
+def shared_cache():
+    """Общий для всех воркеров кэш без ближнего уровня процесса.
+
+    Для значений, которые меняются из любого воркера и должны
+    читаться без задержки: счетчики поколений, набор знаменитостей.
+    """
+    return caches[settings.SHARED_CACHE_ALIAS]
+
+
+def _initial_generation():
+    # Начинаем от времени, чтобы после вытеснения счетчика из кэша
+    # не вернуться к уже использованному поколению.
+    return int(time.time() * 1000)
+
+
+def _get_or_init(keys, initial):
+    counters = shared_cache()
+    values = counters.get_many(keys)
+    for key in keys:
+        if key not in values:
+            counters.add(key, initial(), None)
+            values[key] = counters.get(key)
+    return values
+
+
+def generations(*scopes):
+    """Текущие поколения для областей вида (scope, object_id).
+
+    Поколение области меняется при каждой записи, которая влияет
+    на ее страницы. Поколения входят в ключи кэша страниц и фрагментов,
+    поэтому после записи старые ключи просто перестают читаться.
+    """
+    keys = [_generation_key(scope, object_id) for scope, object_id in scopes]
+    values = _get_or_init(keys, _initial_generation)
+    return '.'.join(str(values[key]) for key in keys)
+
+
+def last_changed(*scopes):
+    """Время (timestamp) последней записи в любую из областей.
+
+    Записывается вместе со сдвигом поколения, поэтому учитывает и
+    правку, и удаление, которых не видно по pub_date и created.
+    Если отметка вытеснена из кэша, считаем, что запись была сейчас.
+    """
+    keys = [_changed_key(scope, object_id) for scope, object_id in scopes]
+    return max(_get_or_init(keys, time.time).values())
+
+
+def _bump(scopes):
+    counters = shared_cache()
+    now = time.time()
+    for scope, object_id in scopes:
+        key = _generation_key(scope, object_id)
+        try:
+            counters.incr(key)
+        except ValueError:
+            counters.add(key, _initial_generation(), None)
+        counters.set(_changed_key(scope, object_id), now, None)
+
+
+def bump_generations(*scopes):
+    """Сдвигает поколения сразу и еще раз после коммита: иначе
+    параллельный запрос мог бы закэшировать данные до коммита
+    под уже новым поколением."""
+    scopes = set(scopes)
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def bump_after_commit(*scopes):
+    """Сдвигает поколения один раз, после коммита.
+
+    Для массовой загрузки новых строк: до коммита их не видно, и
+    закэшированное в это время устареет со сдвигом после коммита.
+    """
+    scopes = set(scopes)
+    if scopes:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _should_refresh(expires_at, delta, beta):
+    # Вероятностное раннее обновление (XFetch): чем ближе срок и чем
+    # дольше считалось значение, тем вероятнее пересчет до срока.
+    # Случайный сдвиг разводит пересчеты разных ключей во времени.
+    return time.time() - delta * beta * math.log(random.random()) >= (
+        expires_at
+    )
+
+
+def get_or_compute(key, compute, timeout, beta=1.0, should_cache=None):
+    """Значение из кэша или результат compute() — один на все воркеры.
+
+    Пересчитывает только тот, кто взял блокировку в общем кэше.
+    Остальные тем временем отдают прежнее значение, а если его
+    нет — ждут, пока оно появится, не дольше RECOMPUTE_LOCK_TIMEOUT.
+    should_cache(value) решает, сохранять ли результат.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires_at, delta = entry
+        if not _should_refresh(expires_at, delta, beta):
+            return value
+    lock_key = f'{key}:lock'
+    locks = shared_cache()
+    # Свой токен: снимаем только свою блокировку, а не взятую другим
+    # воркером после истечения нашей.
+    token = uuid.uuid4().hex
+    locked = locks.add(lock_key, token, RECOMPUTE_LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return entry[0]
+        deadline = time.monotonic() + RECOMPUTE_LOCK_TIMEOUT
+        while time.monotonic() < deadline and locks.get(lock_key):
+            time.sleep(RECOMPUTE_WAIT)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+        # Блокировку сняли без значения (его не стали кэшировать) или
+        # ждать надоело: считаем сами, под блокировкой, если она свободна.
+        locked = locks.add(lock_key, token, RECOMPUTE_LOCK_TIMEOUT)
+    try:
+        # Значение мог только что пересчитать другой воркер, а в ближнем
+        # кэше осталась прежняя копия. Пересчитанное — то, что истекает
+        # позже увиденного: при раннем обновлении увиденное еще не истекло.
+        seen = entry[1] if entry is not None else time.time()
+        fresh = locks.get(key)
+        if fresh is not None and fresh[1] > seen:
+            return fresh[0]
+        start = time.time()
+        value = compute()
+        delta = time.time() - start
+        if should_cache is None or should_cache(value):
+            cache.set(
+                key,
+                (value, start + delta + timeout, delta),
+                timeout + STALE_TIMEOUT,
+            )
+    finally:
+        if locked and locks.get(lock_key) == token:
+            locks.delete(lock_key)
+    return value
+
+
+def _request_scopes(request, get_scopes, kwargs):
+    # Области страницы ищутся в базе один раз на запрос, хотя нужны
+    # и кэшу страниц, и условному GET.
+    if not hasattr(request, '_page_scopes'):
+        request._page_scopes = get_scopes(**kwargs)
+    return request._page_scopes
+
+
+def page_cache(key_prefix, get_scopes=lambda **kwargs: ((ALL, 0),)):
+    """Кэширует страницу целиком, но только для анонимных GET-запросов.
+
+    Страница для вошедшего пользователя персональна (шапка,
+    подписка, форма комментария), поэтому для него view выполняется
+    всегда, а общие части берутся из кэша фрагментов в шаблоне.
+    get_scopes получает аргументы view и возвращает области, от
+    поколений которых зависит страница, или None, если объекта нет.
+    Ключ зависит еще от полного пути (страница, курсор). Истекшую
+    страницу пересчитывает один запрос (см. get_or_compute).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                PAGE_CACHE.inc(page=key_prefix, result='bypass')
+                return view(request, *args, **kwargs)
+            scopes = _request_scopes(request, get_scopes, kwargs)
+            if scopes is None:
+                PAGE_CACHE.inc(page=key_prefix, result='bypass')
+                return view(request, *args, **kwargs)
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            computed = []
+
+            def compute():
+                computed.append(True)
+                return view(request, *args, **kwargs)
+
+            response = get_or_compute(
+                f'{key_prefix}:{generations(*scopes)}:{path}',
+                compute,
+                settings.FEED_CACHE_TIMEOUT,
+                should_cache=lambda response: response.status_code == 200,
+            )
+            PAGE_CACHE.inc(page=key_prefix,
+                           result='miss' if computed else 'hit')
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(get_scopes=lambda **kwargs: ((ALL, 0),)):
+    """ETag и Last-Modified страницы без ее рендера (ответ 304).
+
+    ETag складывается из поколений областей страницы, пути и
+    пользователя, Last-Modified — время последней записи в эти
+    области. Для вошедшего пользователя к областям добавляется его
+    собственная (подписки меняют кнопки на страницах). get_scopes —
+    как у page_cache.
+    """
+    def scopes_for(request, kwargs):
+        scopes = _request_scopes(request, get_scopes, kwargs)
+        if scopes is not None and request.user.is_authenticated:
+            scopes = (*scopes, (USER, request.user.pk))
+        return scopes
+
+    def etag(request, *args, **kwargs):
+        scopes = scopes_for(request, kwargs)
+        if scopes is None:
+            return None
+        key = (f'{generations(*scopes)}:{request.user.pk}:'
+               f'{request.get_full_path()}')
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        scopes = scopes_for(request, kwargs)
+        if scopes is None:
+            return None
+        changed = last_changed(*scopes)
+        # Last-Modified точен до секунды: пока идет секунда последней
+        # записи, следующая запись в ней же была бы неотличима.
+        if time.time() - changed < 1:
+            return None
+        return datetime.fromtimestamp(changed, timezone.utc)
+
+    conditional = condition(etag_func=etag, last_modified_func=last_modified)
+
+    def decorator(view):
+        conditional_view = conditional(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Без Cache-Control браузер сам решает, сколько страница
+            # свежа, и может показать старую ленту без проверки.
+            # private — страницы вошедших не попадают в общие кэши.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_context(*scopes):
+    """Переменные для {% cache %} фрагментов в шаблонах."""
+    return {
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'cache_version': generations(*scopes),
+    }
@@ -0,0 +1,96 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from .models import Post, PostCounter
+
+
+def _count_queryset(scope, object_id):
+    if scope == PostCounter.AUTHOR:
+        return Post.objects.filter(author_id=object_id)
+    if scope == PostCounter.GROUP:
+        return Post.objects.filter(group_id=object_id)
+    return Post.objects.all()
+
+
+def get_post_count(scope=PostCounter.ALL, object_id=0):
+    """Число постов из счетчика.
+
+    Счетчик заводится лениво: при первом чтении значение один раз
+    считается через COUNT(*), дальше его поддерживают сигналы.
+    """
+    value = PostCounter.objects.filter(
+        scope=scope, object_id=object_id
+    ).values_list('value', flat=True).first()
+    if value is None:
+        value = _count_queryset(scope, object_id).count()
+        try:
+            with transaction.atomic():
+                PostCounter.objects.create(
+                    scope=scope, object_id=object_id, value=value
+                )
+        except IntegrityError:
+            # Счетчик уже завел параллельный запрос.
+            pass
+    return value
+
+
+def change_post_count(delta, author_id, group_id=None):
+    """Одним UPDATE сдвигает общий счетчик, счетчик автора и группы.
+
+    Незаведенные счетчики не трогаем: их значение посчитается
+    при первом чтении.
+    """
+    keys = (
+        Q(scope=PostCounter.ALL, object_id=0)
+        | Q(scope=PostCounter.AUTHOR, object_id=author_id)
+    )
+    if group_id is not None:
+        keys |= Q(scope=PostCounter.GROUP, object_id=group_id)
+    PostCounter.objects.filter(keys).update(value=F('value') + delta)
+
+
+def change_group_counts(deltas):
+    """Сдвигает счетчики групп: deltas — {id группы: изменение}.
+
+    Используется при массовом переносе постов, когда сигналы
+    сохранения поста не вызываются.
+    """
+    for group_id, delta in deltas.items():
+        if group_id is not None and delta:
+            PostCounter.objects.filter(
+                scope=PostCounter.GROUP, object_id=group_id
+            ).update(value=F('value') + delta)
+
+
+def _grouped_counts(field):
+    return (
+        Post.objects.filter(**{f'{field}__isnull': False})
+        .order_by()
+        .values_list(field)
+        .annotate(value=Count('pk'))
+    )
+
+
+@transaction.atomic
+def reconcile_post_counts():
+    """Пересчитывает все счетчики по таблице постов.
+
+    Возвращает число исправленных счетчиков.
+    """
+    expected = {(PostCounter.ALL, 0): Post.objects.count()}
+    for author_id, value in _grouped_counts('author_id'):
+        expected[(PostCounter.AUTHOR, author_id)] = value
+    for group_id, value in _grouped_counts('group_id'):
+        expected[(PostCounter.GROUP, group_id)] = value
+    fixed = 0
+    for counter in PostCounter.objects.select_for_update():
+        value = expected.pop((counter.scope, counter.object_id), 0)
+        if counter.value != value:
+            counter.value = value
+            counter.save(update_fields=('value',))
+            fixed += 1
+    PostCounter.objects.bulk_create(
+        PostCounter(scope=scope, object_id=object_id, value=value)
+        for (scope, object_id), value in expected.items()
+    )
+    return fixed + len(expected)
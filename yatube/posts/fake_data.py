@@ -0,0 +1,206 @@
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from .models import Comment, Follow, Group, Post, User
+from .transfer import explicit_dates
+
+BATCH_SIZE = 5000
+PASSWORD = 'benchmark'
+USERNAME_PREFIX = 'bench'
+
+
+class PowerLaw:
+    """Выбор индекса 0..size-1 с весом 1 / (rank + 1) ** alpha.
+
+    Первые индексы выпадают чаще всего: популярные авторы, активные
+    писатели и обсуждаемые посты, как в настоящей соцсети.
+    """
+
+    def __init__(self, size, alpha, rng):
+        self.population = range(size)
+        self.cum_weights = list(accumulate(
+            1 / (rank + 1) ** alpha for rank in range(size)
+        ))
+        self.rng = rng
+
+    def choice(self):
+        return self.rng.choices(self.population,
+                                cum_weights=self.cum_weights)[0]
+
+    def sample(self, count):
+        """До count разных индексов; редкие индексы могут не выпасть."""
+        chosen = set()
+        for _ in range(count * 10):
+            if len(chosen) == count:
+                break
+            chosen.add(self.choice())
+        return chosen
+
+
+class FakeDataGenerator:
+    """Синтетические данные для нагрузочных тестов.
+
+    Подписки образуют степенной граф: число подписок на автора
+    убывает с его рангом как rank ** -follow_alpha. Посты пишут
+    в основном первые по рангу авторы, комментарии собирают
+    в основном первые посты. Все пользователи получают пароль
+    PASSWORD; rng с seed делает набор воспроизводимым.
+    """
+
+    def __init__(self, users=1000, groups=20, posts=10000, comments=20000,
+                 follows_per_user=20, images=0, follow_alpha=1.2,
+                 activity_alpha=1.1, days=365, seed=0, progress=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows_per_user = follows_per_user
+        self.images = images
+        self.follow_alpha = follow_alpha
+        self.activity_alpha = activity_alpha
+        self.days = days
+        self.rng = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.progress = progress or (lambda name, count: None)
+        self.now = timezone.now()
+
+    def _date(self):
+        return self.now - timedelta(
+            seconds=self.rng.randrange(self.days * 24 * 60 * 60)
+        )
+
+    def _bulk_create(self, name, model, objects, **options):
+        batch, count = [], 0
+
+        def flush():
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **options)
+            self.progress(name, count)
+
+        with explicit_dates(model):
+            for obj in objects:
+                batch.append(obj)
+                count += 1
+                if len(batch) == BATCH_SIZE:
+                    flush()
+                    batch = []
+            if batch:
+                flush()
+        return count
+
+    def create_users(self):
+        password = make_password(PASSWORD)
+        start = User.objects.count()
+        self._bulk_create('users', User, (
+            User(
+                username=f'{USERNAME_PREFIX}{start + i}',
+                first_name=self.faker.first_name(),
+                last_name=self.faker.last_name(),
+                email=self.faker.email(),
+                password=password,
+                date_joined=self._date(),
+            )
+            for i in range(self.users)
+        ))
+        return list(User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_groups(self):
+        start = Group.objects.count()
+        self._bulk_create('groups', Group, (
+            Group(
+                title=self.faker.sentence(nb_words=3)[:200],
+                slug=f'g{start + i}',
+                description=self.faker.paragraph(),
+            )
+            for i in range(self.groups)
+        ))
+        return list(Group.objects.order_by('pk').values_list('pk',
+                                                             flat=True))
+
+    def create_follows(self, user_ids):
+        authors = PowerLaw(len(user_ids), self.follow_alpha, self.rng)
+
+        def follows():
+            for user_id in user_ids:
+                # Число подписок тоже неравномерно: от одной до
+                # нескольких follows_per_user.
+                count = min(
+                    int(self.rng.paretovariate(1.5)
+                        * self.follows_per_user / 3) + 1,
+                    len(user_ids) - 1,
+                )
+                for index in authors.sample(count):
+                    if user_ids[index] != user_id:
+                        yield Follow(user_id=user_id,
+                                     author_id=user_ids[index])
+        # Повторный запуск может выбрать уже существующую подписку.
+        return self._bulk_create('follows', Follow, follows(),
+                                 ignore_conflicts=True)
+
+    def make_images(self):
+        """Несколько разных картинок: посты делят их, как репосты."""
+        storage = Post._meta.get_field('image').storage
+        names = []
+        for i in range(self.images):
+            buffer = io.BytesIO()
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            Image.new('RGB', (960, 540), color).save(buffer, 'JPEG')
+            names.append(storage.save(f'posts/fake{i}.jpg',
+                                      ContentFile(buffer.getvalue())))
+        return names
+
+    def create_posts(self, user_ids, group_ids):
+        authors = PowerLaw(len(user_ids), self.activity_alpha, self.rng)
+        images = self.make_images()
+        start = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        self._bulk_create('posts', Post, (
+            Post(
+                text=self.faker.paragraph(nb_sentences=4),
+                pub_date=self._date(),
+                author_id=user_ids[authors.choice()],
+                group_id=(self.rng.choice(group_ids)
+                          if group_ids and self.rng.random() < 0.6
+                          else None),
+                image=(self.rng.choice(images)
+                       if images and self.rng.random() < 0.3 else ''),
+            )
+            for _ in range(self.posts)
+        ))
+        return list(Post.objects.filter(pk__gt=start).order_by(
+            '-pub_date'
+        ).values_list('pk', flat=True))
+
+    def create_comments(self, user_ids, post_ids):
+        if not post_ids:
+            return 0
+        posts = PowerLaw(len(post_ids), self.activity_alpha, self.rng)
+        return self._bulk_create('comments', Comment, (
+            Comment(
+                post_id=post_ids[posts.choice()],
+                author_id=self.rng.choice(user_ids),
+                text=self.faker.sentence(nb_words=12),
+                created=self._date(),
+            )
+            for _ in range(self.comments)
+        ))
+
+    def generate(self):
+        user_ids = self.create_users()
+        group_ids = self.create_groups()
+        self.create_follows(user_ids)
+        post_ids = self.create_posts(user_ids, group_ids)
+        self.create_comments(user_ids, post_ids)
@@ -7,6 +7,18 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        # Ошибки, найденные при потоковой загрузке (posts.uploads):
+        # отклоненный файл в request.FILES уже не попадает.
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, error in self.upload_errors.items():
+            self.add_error(field, error)
+        return cleaned_data
+
     def cleaned_text(self):
         data = self.cleaned_data['text']
 
@@ -0,0 +1,104 @@
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Пропорции карточки поста в ленте и ширины, из которых браузер
+# выбирает подходящую по srcset.
+FRAME = (960, 339)
+RENDITION_WIDTHS = (480, 960, 1440)
+DEFAULT_WIDTH = 960
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+RENDITION_EXTENSIONS = ('jpg', 'png', 'webp')
+
+
+RENDITIONS_DIR = 'posts/renditions'
+
+
+def rendition_prefix(image_name):
+    # Копии одной картинки общие для всех постов, где она встречается.
+    digest = hashlib.md5(image_name.encode()).hexdigest()
+    return f'{RENDITIONS_DIR}/{digest}'
+
+
+def delete_renditions(image_name):
+    # Имена копий известны заранее: каталог копий не перебирается.
+    prefix = rendition_prefix(image_name)
+    for width in RENDITION_WIDTHS:
+        for extension in RENDITION_EXTENSIONS:
+            default_storage.delete(f'{prefix}-{width}.{extension}')
+
+
+def _open(file):
+    image = Image.open(file)
+    # Поворот из EXIF применяем к пикселям: сами метаданные
+    # (EXIF, ICC, комментарии) в копии не попадают.
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    return image.convert('RGBA' if has_alpha else 'RGB'), has_alpha
+
+
+def _encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _save(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.url(default_storage.save(name, content))
+
+
+def make_renditions(image_field, still_needed=None):
+    """Копии картинки поста нескольких ширин в исходном формате и WebP.
+
+    Картинка кадрируется по центру в пропорциях карточки ленты.
+    Ширина DEFAULT_WIDTH есть всегда (маленькие картинки
+    растягиваются), большие ширины — только если хватает исходника.
+    Возвращает URL основной копии и строки srcset для обоих форматов.
+    still_needed() проверяется после кодирования, перед записью
+    файлов: если копии уже не нужны, ничего не пишется и
+    возвращается None.
+    """
+    with image_field.open('rb') as file:
+        image, has_alpha = _open(file)
+    widths = sorted({DEFAULT_WIDTH} | {
+        width for width in RENDITION_WIDTHS if width <= image.width
+    })
+    prefix = rendition_prefix(image_field.name)
+    if has_alpha:
+        extension, image_format, options = 'png', 'PNG', {'optimize': True}
+    else:
+        extension, image_format, options = 'jpg', 'JPEG', {
+            'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True,
+        }
+    encoded = []
+    for width in widths:
+        height = round(width * FRAME[1] / FRAME[0])
+        frame = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        encoded.append((
+            width,
+            _encode(frame, image_format, **options),
+            _encode(frame, 'WEBP', quality=WEBP_QUALITY, method=4),
+        ))
+    if still_needed is not None and not still_needed():
+        return None
+    src, srcset, webp_srcset = '', [], []
+    for width, content, webp_content in encoded:
+        url = _save(f'{prefix}-{width}.{extension}', content)
+        srcset.append(f'{url} {width}w')
+        webp_url = _save(f'{prefix}-{width}.webp', webp_content)
+        webp_srcset.append(f'{webp_url} {width}w')
+        if width == DEFAULT_WIDTH:
+            src = url
+    return {
+        'thumbnail': src,
+        'image_srcset': ', '.join(srcset),
+        'image_webp_srcset': ', '.join(webp_srcset),
+    }
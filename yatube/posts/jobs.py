@@ -0,0 +1,177 @@
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import caching, search
+from .counters import change_group_counts
+from .models import BulkJob, BulkJobItem, Comment, Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BULK_JOB_WORKERS,
+                thread_name_prefix='bulk-jobs',
+            )
+    return _executor
+
+
+def _delete_comments(post_ids):
+    # Комментарии удаляются кусками без загрузки объектов и без
+    # сигналов на каждый: индекс поиска чистится одним запросом на
+    # кусок, а страницы постов обновит сигнал удаления самого поста.
+    batch_size = settings.BULK_JOB_BATCH_SIZE
+    while True:
+        comment_ids = list(
+            Comment.objects.filter(post_id__in=post_ids).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:batch_size]
+        )
+        if not comment_ids:
+            return
+        queryset = Comment.objects.filter(pk__in=comment_ids)
+        queryset._raw_delete(queryset.db)
+        search.remove_documents(search.COMMENT, comment_ids)
+
+
+def _delete_posts(job, post_ids):
+    # Удаление постов через ORM: сигналы (счетчики, кэш, поиск,
+    # картинки) — по одному разу на пост этой пачки.
+    _delete_comments(post_ids)
+    Post.objects.filter(pk__in=post_ids).delete()
+
+
+def _set_group(job, post_ids):
+    # Один UPDATE на пачку вместо сохранения каждого поста, поэтому
+    # счетчики групп и поколения кэша сдвигаются здесь, а не сигналами.
+    moved = list(
+        Post.objects.filter(pk__in=post_ids).exclude(
+            group_id=job.group_id
+        ).values_list('pk', 'author_id', 'group_id')
+    )
+    if not moved:
+        return
+    Post.objects.filter(pk__in=[pk for pk, _, _ in moved]).update(
+        group_id=job.group_id
+    )
+    deltas = Counter()
+    scopes = {(caching.ALL, 0), (caching.GROUP, job.group_id or 0)}
+    for pk, author_id, group_id in moved:
+        deltas[group_id] -= 1
+        deltas[job.group_id] += 1
+        scopes |= {
+            (caching.GROUP, group_id or 0),
+            (caching.AUTHOR, author_id),
+            (caching.POST, pk),
+        }
+    change_group_counts(deltas)
+    caching.bump_generations(*scopes)
+
+
+ACTIONS = {
+    BulkJob.DELETE: _delete_posts,
+    BulkJob.SET_GROUP: _set_group,
+}
+
+
+def run_batch(job):
+    """Обрабатывает следующую пачку задания в отдельной транзакции.
+
+    Возвращает False, когда необработанных постов не осталось.
+    """
+    post_ids = list(
+        job.items.filter(post_id__gt=job.last_id).order_by(
+            'post_id'
+        ).values_list('post_id', flat=True)[:settings.BULK_JOB_BATCH_SIZE]
+    )
+    if not post_ids:
+        return False
+    with transaction.atomic():
+        ACTIONS[job.action](job, post_ids)
+        job.last_id = post_ids[-1]
+        job.done += len(post_ids)
+        job.save(update_fields=('last_id', 'done', 'updated'))
+    return True
+
+
+def run_job(job_id):
+    """Выполняет задание до конца, начиная с последней пачки."""
+    job = BulkJob.objects.filter(pk=job_id).exclude(
+        status=BulkJob.DONE
+    ).first()
+    if job is None:
+        return None
+    job.status, job.error = BulkJob.RUNNING, ''
+    job.save(update_fields=('status', 'error', 'updated'))
+    try:
+        while run_batch(job):
+            pass
+    except Exception as error:
+        logger.exception('Не удалось выполнить задание %s', job.pk)
+        job.status, job.error = BulkJob.FAILED, str(error)
+    else:
+        job.status = BulkJob.DONE
+        # Выбранные посты готовому заданию больше не нужны.
+        job.items.all().delete()
+    job.save(update_fields=('status', 'error', 'updated'))
+    return job
+
+
+def _run(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_job(job):
+    """Ставит задание в очередь после коммита.
+
+    BULK_JOB_WORKERS = 0 — задание выполняется сразу, в текущем потоке.
+    """
+    if settings.BULK_JOB_WORKERS:
+        transaction.on_commit(lambda: _get_executor().submit(_run, job.pk))
+    else:
+        transaction.on_commit(lambda: run_job(job.pk))
+
+
+def enqueue(action, post_ids, user=None, group=None):
+    """Создает задание над постами post_ids и ставит его в очередь.
+
+    post_ids — неповторяющиеся id, например итератор по queryset:
+    они пишутся в базу пачками, не собираясь в памяти целиком.
+    """
+    batch_size = settings.BULK_JOB_BATCH_SIZE
+    with transaction.atomic():
+        job = BulkJob.objects.create(action=action, user=user, group=group)
+        for batch in _chunks(post_ids, batch_size):
+            BulkJobItem.objects.bulk_create(
+                [BulkJobItem(job=job, post_id=pk) for pk in batch],
+                batch_size=batch_size,
+            )
+            job.total += len(batch)
+        job.save(update_fields=('total', 'updated'))
+        schedule_job(job)
+    return job
+
+
+def _chunks(values, size):
+    batch = []
+    for value in values:
+        batch.append(value)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
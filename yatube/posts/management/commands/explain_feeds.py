@@ -0,0 +1,74 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import CursorPaginator
+from posts.timeline import follow_feed
+from posts.views import COMMENTS_PER_PAGE, DEF_VALUE
+
+# SQLite: «SCAN TABLE x» / «SCAN x» без индекса и сортировка во временном
+# B-дереве; PostgreSQL: «Seq Scan». Чтение по индексу в них не попадает.
+FULL_SCAN = re.compile(
+    r'\bSCAN (TABLE )?\w+$|USE TEMP B-TREE FOR ORDER BY|Seq Scan',
+    re.MULTILINE,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов лент и подписок и сообщает '
+        'о планах с полным просмотром таблицы.'
+    )
+
+    def feed_queries(self):
+        user = User.objects.order_by('pk').first()
+        group = Group.objects.order_by('pk').first()
+        post = Post.objects.order_by('pk').first()
+        user_id = user.pk if user else 0
+        group_id = group.pk if group else 0
+        post_id = post.pk if post else 0
+        feeds = {
+            'index': CursorPaginator(Post.objects.for_feed(), DEF_VALUE),
+            'group_posts': CursorPaginator(
+                Post.objects.for_feed().filter(group_id=group_id), DEF_VALUE
+            ),
+            'profile': CursorPaginator(
+                Post.objects.for_feed().filter(author_id=user_id), DEF_VALUE
+            ),
+            'post_detail comments': CursorPaginator(
+                Comment.objects.for_thread().filter(post_id=post_id),
+                COMMENTS_PER_PAGE, 'created', descending=False
+            ),
+        }
+        if user is not None:
+            feeds['follow_index'] = CursorPaginator(
+                follow_feed(user), DEF_VALUE, 'feed_date'
+            )
+        for name, paginator in feeds.items():
+            limit = paginator.per_page + 1
+            yield name, paginator.object_list[:limit]
+            if post is not None:
+                yield f'{name} (cursor)', paginator.seek(
+                    post.pub_date, post.pk
+                )[:limit]
+        yield 'profile following', Follow.objects.filter(
+            user_id=user_id, author_id=user_id
+        )
+        yield 'timeline fan-out', Follow.objects.filter(
+            author_id=user_id
+        ).values_list('user_id', flat=True)
+
+    def handle(self, *args, **options):
+        full_scans = []
+        for name, queryset in self.feed_queries():
+            plan = queryset.explain()
+            self.stdout.write(f'== {name}\n{plan}\n')
+            if FULL_SCAN.search(plan):
+                full_scans.append(name)
+        if full_scans:
+            raise CommandError(
+                'Полный просмотр таблицы в запросах: '
+                + ', '.join(full_scans)
+            )
+        self.stdout.write(self.style.SUCCESS('Все запросы идут по индексам.'))
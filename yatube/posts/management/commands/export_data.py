@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import DATASETS, FORMATS, export_rows, guess_format
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии '
+            'и подписки в JSON Lines или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument(
+            '-o', '--output', default='-',
+            help='Файл для выгрузки, по умолчанию — stdout.',
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат; по умолчанию — по расширению файла, иначе jsonl.',
+        )
+        parser.add_argument(
+            '--with-credentials', action='store_true',
+            help='Выгрузить хэши паролей и права администраторов; '
+                 'без флага пароли непригодны для входа, а права сняты.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['output']
+        data_format = options['format'] or guess_format(path)
+        credentials = options['with_credentials']
+        if path == '-':
+            count = export_rows(options['dataset'], sys.stdout, data_format,
+                                credentials)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                count = export_rows(options['dataset'], stream, data_format,
+                                    credentials)
+        self.stderr.write(f'{options["dataset"]}: выгружено строк: {count}')
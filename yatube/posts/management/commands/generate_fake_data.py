@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts.fake_data import PASSWORD, FakeDataGenerator
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'подписками (степенной граф), постами, комментариями '
+            'и картинками для нагрузочных тестов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows-per-user', type=int, default=20,
+            help='Типичное число подписок; распределение с тяжелым хвостом.',
+        )
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Число разных картинок, которые делят посты.',
+        )
+        parser.add_argument(
+            '--follow-alpha', type=float, default=1.2,
+            help='Показатель степени популярности авторов.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def progress(self, name, count):
+        self.stderr.write(f'{name}: {count}')
+
+    def handle(self, *args, **options):
+        FakeDataGenerator(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows_per_user=options['follows_per_user'],
+            images=options['images'],
+            follow_alpha=options['follow_alpha'],
+            seed=options['seed'],
+            progress=self.progress,
+        ).generate()
+        # Данные записаны мимо сигналов: пересчитываем производные.
+        for command in ('reconcile_post_counts', 'rebuild_search_index',
+                        'rebuild_timelines'):
+            call_command(command, stdout=self.stdout)
+        if options['images']:
+            call_command('generate_thumbnails', stdout=self.stdout)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово. Пароль всех пользователей: {PASSWORD}'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import render_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Готовит превью для картинок постов, у которых их еще нет.'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(
+            thumbnail=''
+        ).values_list('pk', 'image')
+        done = 0
+        for post_id, image_name in posts.iterator():
+            if render_thumbnail(post_id, image_name):
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Готово превью: {done}'))
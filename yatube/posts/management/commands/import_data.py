@@ -0,0 +1,56 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (
+    BATCH_SIZE, DATASETS, FORMATS, guess_format, import_rows
+)
+
+# Производные данные, которые пересчитываются после загрузки набора:
+# bulk_create не вызывает сигналы, которые поддерживают их при записи.
+DERIVED = {
+    'posts': ('reconcile_post_counts', 'rebuild_search_index',
+              'rebuild_timelines'),
+    'comments': ('rebuild_search_index',),
+    'follows': ('rebuild_timelines',),
+}
+
+
+class Command(BaseCommand):
+    help = ('Загружает набор данных из JSON Lines или CSV пачками '
+            'через bulk_create. Наборы загружаются в порядке: users, '
+            'groups, posts, comments, follows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат; по умолчанию — по расширению файла, иначе jsonl.',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счетчики, ленты и поисковый индекс '
+                 '(например, если следом загружаются другие наборы).',
+        )
+
+    def progress(self, count, elapsed):
+        rate = count / elapsed if elapsed else 0
+        self.stderr.write(
+            f'{self.dataset}: {count} строк, {rate:.0f} строк/с'
+        )
+
+    def handle(self, *args, **options):
+        self.dataset = options['dataset']
+        data_format = options['format'] or guess_format(options['path'])
+        with open(options['path'], encoding='utf-8', newline='') as stream:
+            count = import_rows(
+                self.dataset, stream, data_format,
+                batch_size=options['batch_size'], progress=self.progress,
+            )
+        if not options['skip_derived']:
+            for command in DERIVED.get(self.dataset, ()):
+                call_command(command, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.dataset}: загружено строк: {count}'
+        ))
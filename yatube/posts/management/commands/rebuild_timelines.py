@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.caching import shared_cache
+from posts.models import Follow, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Заново раскладывает посты по лентам подписок.'
+
+    def handle(self, *args, **options):
+        TimelineEntry.objects.all().delete()
+        # Подписки могли загрузить мимо сигналов: набор знаменитостей
+        # считается заново.
+        shared_cache().delete(timeline.CELEBRITIES_KEY)
+        celebrities = timeline.celebrity_ids()
+        follows = Follow.objects.exclude(
+            author_id__in=celebrities
+        ).values_list('user_id', 'author_id')
+        for user_id, author_id in follows.iterator():
+            timeline.backfill((user_id,), author_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {TimelineEntry.objects.count()}'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_post_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов (запускать периодически, из cron).'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_post_counts()
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено счетчиков: {fixed}')
+        )
@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import (
+    ClientTarget, HttpTarget, build_scenarios, compare, latest_results,
+    load_results, run_benchmark, save_results
+)
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест всех URL posts.urls: p50/p95/p99, '
+            'SQL-запросы на запрос и пропускная способность. Отчет '
+            'сохраняется в BENCHMARK_DIR и сравнивается с предыдущим. '
+            'Сценарии пишут в базу — запускать на отдельной базе, '
+            'заполненной generate_fake_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запустить только эти сценарии (можно несколько раз).',
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера; без него запросы идут '
+                 'через тестовый клиент в этом процессе.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Параллельных запросов (только с --url).',
+        )
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument(
+            '--compare',
+            help='Отчет для сравнения; по умолчанию — предыдущий '
+                 'с тем же способом запуска.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Рост p95, который считается регрессией (0.1 — 10%%).',
+        )
+        parser.add_argument('--no-save', action='store_true')
+
+    def progress(self, name, result):
+        queries = result['queries']
+        self.stdout.write(
+            f'{name:<22} p50 {result["p50_ms"]:8.1f} '
+            f'p95 {result["p95_ms"]:8.1f} p99 {result["p99_ms"]:8.1f} мс  '
+            f'{result["throughput_rps"]:7.1f} зап/с  '
+            f'SQL {"-" if queries is None else f"{queries:.1f}"}  '
+            f'{",".join(map(str, result["statuses"]))}'
+        )
+
+    def handle(self, *args, **options):
+        if not Post.objects.exists():
+            raise CommandError('В базе нет постов: запустите '
+                               'generate_fake_data.')
+        if options['url']:
+            target = HttpTarget(options['url'])
+        elif options['concurrency'] > 1:
+            raise CommandError('--concurrency работает только с --url.')
+        else:
+            target = ClientTarget()
+        scenarios = build_scenarios()
+        if options['scenarios']:
+            scenarios = [scenario for scenario in scenarios
+                         if scenario.name in options['scenarios']]
+        report = run_benchmark(
+            target, scenarios, options['iterations'], options['warmup'],
+            options['cold'], options['concurrency'], self.progress,
+        )
+        path = None
+        if not options['no_save']:
+            path = save_results(report)
+            self.stdout.write(f'Отчет: {path}')
+        baseline = options['compare'] or latest_results(
+            exclude=path, target=target.name
+        )
+        if baseline:
+            self.report_changes(load_results(baseline), report,
+                                options['threshold'])
+
+    def report_changes(self, baseline, report, threshold):
+        self.stdout.write(f'Сравнение с {baseline["commit"]} '
+                          f'({baseline["created"]}), p95:')
+        regressions = 0
+        for name, before, after, change, regressed in compare(
+            baseline, report, threshold=threshold
+        ):
+            line = f'{name:<22} {before:8.1f} → {after:8.1f} мс {change:+.0%}'
+            if regressed:
+                regressions += 1
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        if regressions:
+            self.stdout.write(self.style.ERROR(
+                f'Регрессий: {regressions}'
+            ))
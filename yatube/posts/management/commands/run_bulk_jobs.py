@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.jobs import run_job
+from posts.models import BulkJob
+
+
+class Command(BaseCommand):
+    help = ('Выполняет незавершенные массовые действия с места остановки '
+            '(например, после перезапуска сервера).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Повторить и задания, завершившиеся ошибкой.',
+        )
+
+    def handle(self, *args, **options):
+        statuses = [BulkJob.PENDING, BulkJob.RUNNING]
+        if options['retry_failed']:
+            statuses.append(BulkJob.FAILED)
+        jobs = BulkJob.objects.filter(status__in=statuses).order_by('pk')
+        for job_id in jobs.values_list('pk', flat=True):
+            job = run_job(job_id)
+            if job is not None:
+                self.stdout.write(
+                    f'{job}: {job.get_status_display()}, '
+                    f'{job.done} из {job.total}'
+                )
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-16 22:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Счетчики постов и ленты подписок поверх исходной схемы (0001).
+# Счетчики заводятся лениво при первом чтении, ленты подписок
+# существующих пользователей заполняет manage.py rebuild_timelines.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('all', 'Все посты'), ('author', 'Посты автора'), ('group', 'Посты группы')], max_length=10)),
+                ('object_id', models.PositiveIntegerField(default=0)),
+                ('value', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Счетчик постов',
+                'verbose_name_plural': 'Счетчики постов',
+                'unique_together': {('scope', 'object_id')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'pub_date'], name='posts_timel_user_id_6167f1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'author'], name='posts_timel_user_id_b036fb_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='timelineentry',
+            unique_together={('user', 'post')},
+        ),
+    ]
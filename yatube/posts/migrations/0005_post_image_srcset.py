@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-16 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_srcset',
+            field=models.TextField(blank=True, editable=False, verbose_name='Копии картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_webp_srcset',
+            field=models.TextField(blank=True, editable=False, verbose_name='Копии картинки в WebP'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+import re
+
+from django.db import migrations
+
+from posts.stemmer import stem
+
+SEARCH_TABLE = 'posts_search'
+
+
+def create_search_table(apps, schema_editor):
+    # Полнотекстовый индекс есть только в SQLite (FTS5); для других СУБД
+    # posts.search выбирает поиск без индекса.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING '
+        "fts5(terms, tokenize='unicode61 remove_diacritics 2')"
+    )
+    # Уже опубликованное: посты с четными rowid, комментарии с нечетными.
+    for model_name, kind in (('Post', 0), ('Comment', 1)):
+        model = apps.get_model('posts', model_name)
+        for pk, text in model.objects.values_list('pk', 'text').iterator():
+            schema_editor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, terms) VALUES (%s, %s)',
+                [pk * 2 + kind,
+                 ' '.join(stem(word) for word in re.findall(r'\w+', text))],
+            )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
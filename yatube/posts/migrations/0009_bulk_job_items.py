@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-16 23:53
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_post_ids(apps, schema_editor):
+    # Незавершенные задания продолжаются с тех же постов.
+    BulkJob = apps.get_model('posts', 'BulkJob')
+    BulkJobItem = apps.get_model('posts', 'BulkJobItem')
+    for job in BulkJob.objects.exclude(status='done').iterator():
+        BulkJobItem.objects.bulk_create(
+            BulkJobItem(job_id=job.pk, post_id=post_id)
+            for post_id in json.loads(job.post_ids)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_bulk_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkJobItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.PositiveIntegerField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='posts.BulkJob')),
+            ],
+            options={
+                'unique_together': {('job', 'post_id')},
+            },
+        ),
+        migrations.RunPython(move_post_ids, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='bulkjob',
+            name='post_ids',
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 
 User = get_user_model()
 
@@ -14,6 +16,35 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'text',
+        'pub_date',
+        'image',
+        'thumbnail',
+        'image_srcset',
+        'image_webp_srcset',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group__title',
+        'group__slug',
+    )
+
+    def for_feed(self, **annotations):
+        """Посты для лент: автор и группа одним запросом,
+        только поля, которые выводят шаблоны лент.
+
+        Дополнительные аннотации передаются именованными аргументами.
+        """
+        queryset = self.select_related('author', 'group').only(
+            *self.FEED_FIELDS
+        )
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст')
     pub_date = models.DateTimeField(auto_now_add=True)
@@ -32,18 +63,58 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # URL копий картинки готовит фоновый пул (posts.thumbnails), чтобы
+    # лента не обращалась к Pillow и хранилищу превью при показе.
+    thumbnail = models.CharField(
+        'Превью',
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+    image_srcset = models.TextField(
+        'Копии картинки',
+        blank=True,
+        editable=False
+    )
+    image_webp_srcset = models.TextField(
+        'Копии картинки в WebP',
+        blank=True,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы лент: главная, профиль и группа. Индексы строятся
+        # по возрастанию и читаются с конца: id входит в индекс SQLite
+        # неявно по возрастанию, и только так порядок (-pub_date, -id)
+        # берется из индекса без дополнительной сортировки.
+        indexes = (
+            models.Index(fields=('pub_date',)),
+            models.Index(fields=('author', 'pub_date')),
+            models.Index(fields=('group', 'pub_date')),
+            # Ссылки на общий файл картинки (posts.storage).
+            models.Index(fields=('image',)),
+        )
 
     def __str__(self):
         return self.text[:15]
 
 
+class CommentQuerySet(models.QuerySet):
+    def for_thread(self):
+        """Комментарии вместе с авторами одним запросом."""
+        return self.select_related('author').only(
+            'post_id', 'text', 'created', 'author__username'
+        )
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -61,6 +132,13 @@ class Comment(models.Model):
     text = models.TextField(verbose_name='Комментарий')
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('post', 'created')),
+        )
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -76,5 +154,144 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+        )
+
     def __str__(self):
         return self.author
+
+
+class PostCounter(models.Model):
+    """Денормализованный счетчик постов: всего, у автора и в группе."""
+    ALL = 'all'
+    AUTHOR = 'author'
+    GROUP = 'group'
+    SCOPE_CHOICES = (
+        (ALL, 'Все посты'),
+        (AUTHOR, 'Посты автора'),
+        (GROUP, 'Посты группы'),
+    )
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    object_id = models.PositiveIntegerField(default=0)
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('scope', 'object_id')
+        verbose_name = 'Счетчик постов'
+        verbose_name_plural = 'Счетчики постов'
+
+    def __str__(self):
+        return f'{self.scope}:{self.object_id}={self.value}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя (fan-out при записи)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = (
+            models.Index(fields=('user', 'pub_date')),
+            models.Index(fields=('user', 'author')),
+        )
+
+
+class BulkJob(models.Model):
+    """Массовое действие над постами, выполняемое в фоне пачками.
+
+    Выбранные посты лежат в BulkJobItem и обрабатываются
+    по возрастанию id, last_id — курсор последней завершенной пачки:
+    прерванное задание продолжается с него, а не с начала.
+    """
+    DELETE = 'delete'
+    SET_GROUP = 'set_group'
+    ACTION_CHOICES = (
+        (DELETE, 'Удаление постов'),
+        (SET_GROUP, 'Перенос постов в группу'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    action = models.CharField('Действие', max_length=20,
+                              choices=ACTION_CHOICES)
+    status = models.CharField('Состояние', max_length=10,
+                              choices=STATUS_CHOICES, default=PENDING)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Группа',
+    )
+    total = models.PositiveIntegerField('Всего', default=0)
+    done = models.PositiveIntegerField('Обработано', default=0)
+    last_id = models.PositiveIntegerField(default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Массовое действие'
+        verbose_name_plural = 'Массовые действия'
+
+    def __str__(self):
+        return f'{self.get_action_display()} #{self.pk}'
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 100
+        return self.done * 100 // self.total
+
+
+class BulkJobItem(models.Model):
+    """Пост, выбранный для массового действия."""
+    job = models.ForeignKey(
+        BulkJob,
+        on_delete=models.CASCADE,
+        related_name='items',
+    )
+    post_id = models.PositiveIntegerField()
+
+    class Meta:
+        # Индекс для выборки пачек по курсору: job_id, post_id > last_id.
+        unique_together = ('job', 'post_id')
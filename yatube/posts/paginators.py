@@ -0,0 +1,163 @@
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CountedPaginator(Paginator):
+    """Paginator, которому число объектов передают снаружи (из счетчика)."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator без полного COUNT(*) для больших таблиц.
+
+    Для выборки без фильтров число берется из get_count (счетчика),
+    для отфильтрованной — считается не дальше limit строк: дальние
+    страницы отфильтрованного списка все равно никто не листает.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, get_count=None,
+                 limit=10000):
+        super().__init__(object_list, per_page, orphans,
+                         allow_empty_first_page)
+        self.get_count = get_count
+        self.limit = limit
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if self.get_count is not None and not queryset.query.where:
+            return self.get_count()
+        return queryset.order_by().values('pk')[:self.limit].count()
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинатор по паре (date_field, id).
+
+    Каждая страница — один запрос с LIMIT per_page + 1 без OFFSET,
+    поэтому глубокие страницы стоят столько же, сколько первая,
+    а запрос COUNT(*) не выполняется вовсе: num_pages известен
+    пагинатору только до следующей за текущей страницы.
+    Курсоры непрозрачны для клиента и приходят в ?cursor=.
+    По умолчанию сначала идут новые записи (descending=True).
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 descending=True):
+        self.date_field = date_field
+        self.descending = descending
+        super().__init__(
+            object_list.order_by(*self._ordering(descending)), per_page
+        )
+
+    def _ordering(self, descending):
+        sign = '-' if descending else ''
+        return f'{sign}{self.date_field}', f'{sign}pk'
+
+    def encode_cursor(self, direction, obj, number):
+        value = getattr(obj, self.date_field).isoformat()
+        raw = f'{direction}|{value}|{obj.pk}|{number}'
+        return urlsafe_base64_encode(raw.encode())
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = urlsafe_base64_decode(cursor).decode()
+            direction, value, pk, number = raw.split('|')
+            value = parse_datetime(value)
+            pk, number = int(pk), int(number)
+        except (TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if direction not in (NEXT, PREVIOUS) or value is None:
+            raise InvalidCursor(cursor)
+        return direction, value, pk, max(number, 1)
+
+    def _slice(self, queryset):
+        rows = list(queryset[:self.per_page + 1])
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def seek(self, value, pk, forward=True):
+        """Записи после (или до) позиции курсора (value, pk)."""
+        lookup = 'lt' if forward == self.descending else 'gt'
+        # Условие на диапазон date_field отдельно от OR, чтобы
+        # база читала страницу по индексу, а не сортировала выборку.
+        queryset = self.object_list.filter(
+            **{f'{self.date_field}__{lookup}e': value}
+        ).filter(
+            Q(**{f'{self.date_field}__{lookup}': value})
+            | Q(**{f'pk__{lookup}': pk})
+        )
+        if forward:
+            return queryset
+        return queryset.order_by(*self._ordering(not self.descending))
+
+    def page(self, cursor=None):
+        if not cursor:
+            number = 1
+            rows, has_next = self._slice(self.object_list)
+        else:
+            direction, value, pk, number = self.decode_cursor(cursor)
+            if direction == NEXT:
+                rows, has_next = self._slice(self.seek(value, pk, True))
+            else:
+                rows, has_previous = self._slice(
+                    self.seek(value, pk, False)
+                )
+                rows.reverse()
+                has_next = True
+                number = max(number, 2) if has_previous else 1
+            if not rows:
+                return self.page()
+        self.num_pages = number + 1 if has_next else number
+        page = self._get_page(rows, number, self)
+        page.cursor = cursor
+        page.next_cursor = (
+            self.encode_cursor(NEXT, rows[-1], number + 1)
+            if has_next else None
+        )
+        page.previous_cursor = (
+            self.encode_cursor(PREVIOUS, rows[0], number - 1)
+            if number > 1 else None
+        )
+        return page
+
+    def get_page(self, cursor=None):
+        """Как Paginator.get_page: битый курсор ведет на первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+def paginate(request, queryset, per_page, get_count=None,
+             date_field='pub_date'):
+    """Возвращает страницу ленты для запроса.
+
+    Старые ссылки вида ?page=N обслуживаются обычным Paginator,
+    все остальные запросы — курсорным пагинатором (?cursor=...).
+    get_count — функция, возвращающая число постов из счетчика;
+    с ней нумерованные страницы тоже обходятся без COUNT(*).
+    date_field — поле (или аннотация) с датой для курсора.
+    """
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        if get_count is None:
+            return Paginator(queryset, per_page).get_page(page_number)
+        return CountedPaginator(queryset, per_page, get_count()).get_page(
+            page_number
+        )
+    cursor = request.GET.get('cursor')
+    return CursorPaginator(queryset, per_page, date_field).get_page(cursor)
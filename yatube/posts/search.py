@@ -0,0 +1,270 @@
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+from .stemmer import stem
+
+POST = 'post'
+COMMENT = 'comment'
+SEARCH_TABLE = 'posts_search'
+WORD = re.compile(r'\w+')
+MAX_QUERY_TERMS = 10
+SNIPPET_WORDS = 30
+BATCH_SIZE = 1000
+
+SearchResult = namedtuple('SearchResult', 'kind post comment snippet')
+
+
+def terms(text):
+    """Основы слов текста — то, что хранится в индексе."""
+    return [stem(word) for word in WORD.findall(text)]
+
+
+def _rowid(kind, object_id):
+    # Посты и комментарии в одном индексе: четные и нечетные rowid.
+    return object_id * 2 + (kind == COMMENT)
+
+
+def _split_rowid(rowid):
+    return (COMMENT if rowid % 2 else POST), rowid // 2
+
+
+class SearchBackend:
+    """Поисковый индекс: документы (kind, id) со строкой основ слов.
+
+    search() возвращает строки (rowid, score) по возрастанию
+    (score, rowid) после курсора after — пары из последней строки
+    предыдущей страницы; kind ограничивает поиск постами
+    или комментариями.
+    """
+
+    def index(self, rowid, text):
+        raise NotImplementedError
+
+    def remove(self, rowid):
+        raise NotImplementedError
+
+    def remove_many(self, rowids):
+        for rowid in rowids:
+            self.remove(rowid)
+
+    def rebuild(self, documents):
+        raise NotImplementedError
+
+    def search(self, query_terms, after, limit, kind=None):
+        raise NotImplementedError
+
+
+class Fts5SearchBackend(SearchBackend):
+    """Инвертированный индекс SQLite FTS5 с ранжированием bm25."""
+
+    def index(self, rowid, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid]
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, terms) VALUES (%s, %s)',
+                [rowid, ' '.join(terms(text))],
+            )
+
+    def remove(self, rowid):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid]
+            )
+
+    def remove_many(self, rowids):
+        if not rowids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN '
+                f'({", ".join(["%s"] * len(rowids))})',
+                list(rowids),
+            )
+
+    def rebuild(self, documents):
+        insert = f'INSERT INTO {SEARCH_TABLE} (rowid, terms) VALUES (%s, %s)'
+        count, batch = 0, []
+        # Одна транзакция: в режиме autocommit каждая строка
+        # executemany фиксировалась бы на диске отдельно.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            for rowid, text in documents:
+                batch.append((rowid, ' '.join(terms(text))))
+                if len(batch) == BATCH_SIZE:
+                    cursor.executemany(insert, batch)
+                    count, batch = count + len(batch), []
+            cursor.executemany(insert, batch)
+        return count + len(batch)
+
+    def search(self, query_terms, after, limit, kind=None):
+        # Основы в кавычках: слова запроса должны встретиться все.
+        match = ' '.join(f'"{term}"' for term in query_terms)
+        sql = (f'SELECT rowid, rank FROM {SEARCH_TABLE} '
+               f'WHERE {SEARCH_TABLE} MATCH %s')
+        params = [match]
+        if kind is not None:
+            sql += ' AND rowid %% 2 = %s'
+            params.append(_rowid(kind, 0))
+        if after is not None:
+            score, rowid = after
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+            params += [score, score, rowid]
+        sql += ' ORDER BY rank, rowid LIMIT %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+
+class SimpleSearchBackend(SearchBackend):
+    """Поиск без индекса для других СУБД: LIKE по основам слов.
+
+    Ранжирования нет, новые документы идут первыми (score = 0,
+    rowid по убыванию, поэтому в курсоре rowid берется со знаком минус).
+    """
+
+    def index(self, rowid, text):
+        pass
+
+    def remove(self, rowid):
+        pass
+
+    def rebuild(self, documents):
+        return 0
+
+    def search(self, query_terms, after, limit, kind=None):
+        rows = []
+        for model, model_kind in ((Post, POST), (Comment, COMMENT)):
+            if kind is not None and model_kind != kind:
+                continue
+            queryset = model.objects.order_by('-pk')
+            for term in query_terms:
+                queryset = queryset.filter(text__icontains=term)
+            if after is not None:
+                bound = -after[1] - _rowid(model_kind, 0) - 1
+                queryset = queryset.filter(pk__lte=bound // 2)
+            rows += [(-_rowid(model_kind, pk), 0.0)
+                     for pk in queryset.values_list('pk', flat=True)[:limit]]
+        rows.sort()
+        return [(rowid, score) for rowid, score in rows[:limit]]
+
+
+def get_backend():
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)()
+    if connection.vendor == 'sqlite':
+        return Fts5SearchBackend()
+    return SimpleSearchBackend()
+
+
+def index_document(kind, object_id, text):
+    get_backend().index(_rowid(kind, object_id), text)
+
+
+def remove_document(kind, object_id):
+    get_backend().remove(_rowid(kind, object_id))
+
+
+def remove_documents(kind, object_ids):
+    """Убирает из индекса документы kind одним запросом."""
+    get_backend().remove_many(
+        [_rowid(kind, object_id) for object_id in object_ids]
+    )
+
+
+def rebuild_index():
+    """Заново строит индекс по всем постам и комментариям."""
+    def documents():
+        for model, kind in ((Post, POST), (Comment, COMMENT)):
+            rows = model.objects.order_by().values_list('pk', 'text')
+            for pk, text in rows.iterator():
+                yield _rowid(kind, pk), text
+    return get_backend().rebuild(documents())
+
+
+def search_post_ids(query, limit):
+    """id постов, в тексте которых есть все слова запроса,
+    не больше limit самых релевантных."""
+    query_terms = list(dict.fromkeys(terms(query)))[:MAX_QUERY_TERMS]
+    if not query_terms:
+        return []
+    rows = get_backend().search(query_terms, None, limit, kind=POST)
+    return [_split_rowid(abs(rowid))[1] for rowid, score in rows]
+
+
+def highlight(text, query_terms):
+    """Фрагмент текста вокруг первого совпадения, совпадения в <mark>."""
+    words = list(WORD.finditer(text))
+    if not words:
+        return escape(text)
+    hits = [i for i, word in enumerate(words)
+            if stem(word.group()) in query_terms]
+    first = max((hits[0] if hits else 0) - SNIPPET_WORDS // 3, 0)
+    last = min(first + SNIPPET_WORDS, len(words)) - 1
+    begin = words[first].start() if first else 0
+    end = words[last].end() if last < len(words) - 1 else len(text)
+    parts, position = ['…' if begin else ''], begin
+    for word in words[first:last + 1]:
+        if stem(word.group()) in query_terms:
+            parts += [escape(text[position:word.start()]),
+                      f'<mark>{escape(word.group())}</mark>']
+            position = word.end()
+    parts += [escape(text[position:end]), '…' if end < len(text) else '']
+    return mark_safe(''.join(parts))
+
+
+def _encode_cursor(rowid, score):
+    return urlsafe_base64_encode(f'{score!r}|{rowid}'.encode())
+
+
+def _decode_cursor(cursor):
+    try:
+        score, rowid = urlsafe_base64_decode(cursor).decode().split('|')
+        return float(score), int(rowid)
+    except (TypeError, ValueError):
+        return None
+
+
+def search(query, cursor=None, limit=10):
+    """Страница результатов поиска и курсор следующей страницы.
+
+    Найденные посты и комментарии загружаются двумя запросами;
+    документы, удаленные после индексации, пропускаются.
+    """
+    query_terms = list(dict.fromkeys(terms(query)))[:MAX_QUERY_TERMS]
+    if not query_terms:
+        return [], None
+    after = _decode_cursor(cursor) if cursor else None
+    rows = get_backend().search(query_terms, after, limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(*rows[-1])
+    documents = [_split_rowid(abs(rowid)) for rowid, score in rows]
+    comments = Comment.objects.for_thread().in_bulk(
+        [pk for kind, pk in documents if kind == COMMENT]
+    )
+    posts = Post.objects.for_feed().in_bulk(
+        [pk for kind, pk in documents if kind == POST]
+        + [comment.post_id for comment in comments.values()]
+    )
+    results = []
+    for kind, pk in documents:
+        comment = comments.get(pk) if kind == COMMENT else None
+        post = posts.get(comment.post_id if comment else pk)
+        if post is None or (kind == COMMENT and comment is None):
+            continue
+        text = comment.text if comment else post.text
+        results.append(SearchResult(
+            kind, post, comment, highlight(text, query_terms)
+        ))
+    return results, next_cursor
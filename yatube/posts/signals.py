@@ -0,0 +1,205 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import caching, search, thumbnails, timeline
+from .counters import change_post_count
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+# Поля пользователя, которые выводятся на страницах постов.
+USER_PAGE_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_owner(sender, instance, raw, **kwargs):
+    """Запоминает автора, группу и картинку поста до редактирования."""
+    instance._saved_owner = instance._saved_image = None
+    if raw or instance._state.adding:
+        return
+    saved = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('author_id', 'group_id', 'image').first()
+    if saved is not None:
+        instance._saved_owner, instance._saved_image = saved[:2], saved[2]
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    owner = (instance.author_id, instance.group_id)
+    saved_owner = getattr(instance, '_saved_owner', None)
+    if created:
+        change_post_count(1, *owner)
+        timeline.fan_out_post(instance)
+    elif saved_owner is not None and saved_owner != owner:
+        change_post_count(-1, *saved_owner)
+        change_post_count(1, *owner)
+
+
+@receiver(post_save, sender=Post)
+def confirm_uploaded_image(sender, instance, raw, **kwargs):
+    """Пост с новой картинкой сохранен: бронь загрузки не нужна."""
+    image_name = instance.image.name
+    saved_image = getattr(instance, '_saved_image', None)
+    if not raw and image_name and image_name != saved_image:
+        storage = instance.image.storage
+        transaction.on_commit(lambda: storage.unreserve(image_name))
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, raw, **kwargs):
+    saved_image = getattr(instance, '_saved_image', None)
+    if not raw and saved_image and saved_image != instance.image.name:
+        transaction.on_commit(
+            lambda: thumbnails.release_image(saved_image)
+        )
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    image_name = instance.image.name
+    if image_name:
+        transaction.on_commit(
+            lambda: thumbnails.release_image(image_name)
+        )
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_post_count(-1, instance.author_id, instance.group_id)
+
+
+def _post_scopes(author_id, group_id, post_id):
+    return (
+        (caching.ALL, 0),
+        (caching.AUTHOR, author_id),
+        (caching.GROUP, group_id or 0),
+        (caching.POST, post_id),
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    scopes = _post_scopes(instance.author_id, instance.group_id, instance.pk)
+    saved_owner = getattr(instance, '_saved_owner', None)
+    if saved_owner is not None:
+        scopes += _post_scopes(*saved_owner, instance.pk)
+    caching.bump_generations(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump_generations((caching.POST, instance.post_id))
+
+
+def _group_author_scopes(group_id):
+    return [
+        (caching.AUTHOR, author_id)
+        for author_id in Post.objects.filter(
+            group_id=group_id
+        ).values_list('author_id', flat=True).distinct()
+    ]
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_authors(sender, instance, **kwargs):
+    """Авторы постов группы: после удаления их посты уже без группы
+    (SET_NULL — массовый UPDATE без сигналов постов)."""
+    instance._author_scopes = _group_author_scopes(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, raw=False, **kwargs):
+    # Ссылки на группу есть и в профилях авторов ее постов.
+    if not raw:
+        author_scopes = getattr(instance, '_author_scopes', None)
+        if author_scopes is None:
+            author_scopes = _group_author_scopes(instance.pk)
+        caching.bump_generations(
+            (caching.ALL, 0), (caching.GROUP, instance.pk), *author_scopes
+        )
+
+
+@receiver(pre_save, sender=User)
+def remember_user_name(sender, instance, raw, update_fields=None, **kwargs):
+    instance._saved_name = None
+    if update_fields is not None and not set(update_fields) & set(
+        USER_PAGE_FIELDS
+    ):
+        return
+    if not raw and not instance._state.adding:
+        instance._saved_name = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*USER_PAGE_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, raw, **kwargs):
+    """Имя пользователя сменили: обновить страницы с его постами и
+    комментариями. Вход (last_login) страниц не меняет."""
+    saved_name = getattr(instance, '_saved_name', None)
+    name = tuple(getattr(instance, field) for field in USER_PAGE_FIELDS)
+    if raw or saved_name is None or saved_name == name:
+        return
+    group_ids = Post.objects.filter(
+        author=instance
+    ).values_list('group_id', flat=True).distinct()
+    post_ids = Comment.objects.filter(
+        author=instance
+    ).values_list('post_id', flat=True).distinct()
+    caching.bump_generations(
+        (caching.ALL, 0),
+        (caching.AUTHOR, instance.pk),
+        *((caching.GROUP, group_id or 0) for group_id in group_ids),
+        *((caching.POST, post_id) for post_id in post_ids),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        timeline.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    timeline.unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follower_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.bump_generations((caching.USER, instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search.index_document(search.POST, instance.pk, instance.text)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.index_document(search.COMMENT, instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_document(search.POST, instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.remove_document(search.COMMENT, instance.pk)
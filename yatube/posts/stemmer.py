@@ -0,0 +1,131 @@
+"""Стеммер Snowball для русского языка.
+
+Сокращает слово до основы: «котами», «коты», «кот» → «кот».
+Перевод алгоритма https://snowballstem.org/algorithms/russian/stemmer.html
+без внешних зависимостей: в индексе поиска хранятся основы слов.
+"""
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+# Окончания из первой группы стоят только после «а» или «я».
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = ((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = ((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+SUPERLATIVE = ((), ('ейш', 'ейше'))
+DERIVATIONAL = ('ост', 'ость')
+
+
+def _regions(word):
+    """Начала областей RV и R2 алгоритма."""
+    rv = next(
+        (i + 1 for i, letter in enumerate(word) if letter in VOWELS),
+        len(word),
+    )
+
+    def after_vowel_consonant(start):
+        for i in range(max(start, 1), len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    return rv, after_vowel_consonant(after_vowel_consonant(1))
+
+
+def _remove(word, groups):
+    """Удаляет самое длинное подходящее окончание; None, если его нет.
+
+    Как в Snowball, выбирается самое длинное окончание, и если его
+    условие не выполнено, более короткие уже не проверяются.
+    """
+    after_a, anywhere = groups
+    suffix = max(
+        (suffix for suffix in after_a + anywhere if word.endswith(suffix)),
+        key=len,
+        default=None,
+    )
+    if suffix is None:
+        return None
+    stem = word[:-len(suffix)]
+    if suffix not in anywhere and not stem.endswith(('а', 'я')):
+        return None
+    return stem
+
+
+def _remove_adjectival(word):
+    stem = _remove(word, ADJECTIVE)
+    if stem is None:
+        return None
+    participle = _remove(stem, PARTICIPLE)
+    return stem if participle is None else participle
+
+
+def _remove_ending(rv):
+    """Шаг 1: деепричастие или (возвратность) + прилагательное,
+    глагол, существительное."""
+    result = _remove(rv, PERFECTIVE_GERUND)
+    if result is not None:
+        return result
+    reflexive = _remove(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    for remove in (_remove_adjectival,
+                   lambda word: _remove(word, VERB),
+                   lambda word: _remove(word, NOUN)):
+        result = remove(rv)
+        if result is not None:
+            return result
+    return rv
+
+
+def _tidy_up(rv):
+    """Шаг 4: «нн» → «н», превосходная степень, мягкий знак."""
+    if rv.endswith('нн'):
+        return rv[:-1]
+    superlative = _remove(rv, SUPERLATIVE)
+    if superlative is not None:
+        return superlative[:-1] if superlative.endswith('нн') else (
+            superlative
+        )
+    if rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+# Частые слова повторяются, основа считается для них один раз.
+@lru_cache(maxsize=65536)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv_start, r2_start = _regions(word)
+    head, rv = word[:rv_start], _remove_ending(word[rv_start:])
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    r2 = r2_start - rv_start
+    for suffix in DERIVATIONAL:
+        if rv.endswith(suffix) and len(rv) - len(suffix) >= r2:
+            rv = rv[:-len(suffix)]
+            break
+    return head + _tidy_up(rv)
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import locks
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под хэшем содержимого: posts/ab/abcd….jpg.
+
+    Одинаковые файлы разных авторов лежат на диске один раз, а имя
+    файла никогда не меняет содержимое, поэтому URL можно кэшировать
+    навсегда. Файл удаляется, когда на него не ссылается ни один пост
+    (см. posts.thumbnails.release_image).
+
+    Повторная загрузка существующего файла ничего не пишет, поэтому
+    удаление файла и такая загрузка идут под общей блокировкой, а файл
+    после загрузки RESERVE_SECONDS считается занятым: пост с ним
+    еще может быть не сохранен в базе. Блокировка и брони лежат
+    в MEDIA_STATE_DIR, вне раздаваемого MEDIA_ROOT.
+    """
+    RESERVE_SECONDS = 60
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        with self.locked():
+            if self.exists(name):
+                self._reserve(name)
+                return name
+            return super()._save(name, content)
+
+    @staticmethod
+    def _state_path(name):
+        os.makedirs(settings.MEDIA_STATE_DIR, exist_ok=True)
+        return os.path.join(settings.MEDIA_STATE_DIR, name)
+
+    @contextmanager
+    def locked(self):
+        """Блокировка хранилища, общая для всех процессов на машине."""
+        with open(self._state_path('images.lock'), 'a') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def _reservations_path(self):
+        return self._state_path('reserved.json')
+
+    def _reservations(self):
+        try:
+            with open(self._reservations_path()) as stream:
+                reservations = json.load(stream)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {name: until for name, until in reservations.items()
+                if until > now}
+
+    def _write_reservations(self, reservations):
+        with open(self._reservations_path(), 'w') as stream:
+            json.dump(reservations, stream)
+
+    def _reserve(self, name):
+        reservations = self._reservations()
+        reservations[name] = time.time() + self.RESERVE_SECONDS
+        self._write_reservations(reservations)
+
+    def unreserve(self, name):
+        """Снимает бронь: пост с файлом сохранен в базе."""
+        # Обычно брони нет (файл загружен впервые): без блокировки.
+        # Пропущенная из-за гонки бронь просто истечет сама.
+        if name not in self._reservations():
+            return
+        with self.locked():
+            reservations = self._reservations()
+            if reservations.pop(name, None) is not None:
+                self._write_reservations(reservations)
+
+    def reserved_for(self, name):
+        """Сколько секунд файл еще занят загрузкой; под locked()."""
+        until = self._reservations().get(name)
+        return max(until - time.time(), 0) if until else 0
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def add_posts(self, count):
+        Post.objects.bulk_create(
+            Post(author=User.objects.create_user(username=f'author{i}'),
+                 group=self.group, text=f'Пост {i}')
+            for i in range(Post.objects.count(),
+                           Post.objects.count() + count)
+        )
+
+    def count_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return queries
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не растет с числом постов и групп."""
+        self.add_posts(1)
+        self.client.get(self.url)
+        few_posts = len(self.count_queries())
+        self.add_posts(20)
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'group{i}', description='')
+            for i in range(20)
+        )
+        queries = self.count_queries()
+        self.assertEqual(len(queries), few_posts)
+        self.assertFalse(
+            [query for query in queries
+             if 'COUNT(*)' in query['sql'] and 'posts_post' in query['sql']
+             and 'LIMIT' not in query['sql']]
+        )
+
+    def test_group_uses_autocomplete(self):
+        """Группа в строке — поле автодополнения, а не список групп."""
+        self.add_posts(1)
+        Group.objects.create(title='Другая', slug='other', description='')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, f'>{self.group.title}</option>')
+        self.assertNotContains(response, '>Другая</option>')
+
+    def test_search_uses_full_text_index(self):
+        """Поиск находит формы слова через полнотекстовый индекс."""
+        post = Post.objects.create(
+            author=self.admin, text='Коты любят рыбу'
+        )
+        self.add_posts(3)
+        response = self.client.get(self.url, {'q': 'кот'})
+        self.assertEqual(list(response.context['cl'].result_list), [post])
+
+    def test_date_hierarchy(self):
+        """Список можно сузить по году публикации."""
+        self.add_posts(2)
+        year = Post.objects.first().pub_date.year
+        response = self.client.get(self.url, {'pub_date__year': year})
+        self.assertEqual(response.context['cl'].result_count, 2)
@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from statistics import median
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from .. import urls
+from ..benchmark import build_scenarios, percentile
+from ..models import Comment, Post, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(BENCHMARK_DIR=os.path.join(TEMP_DIR, 'benchmarks'),
+                   MEDIA_ROOT=os.path.join(TEMP_DIR, 'media'))
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('generate_fake_data', '--users', '40', '--groups', '3',
+                     '--posts', '80', '--comments', '150',
+                     '--follows-per-user', '6', '--seed', '1',
+                     stdout=StringIO(), stderr=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_generated_graph_is_skewed(self):
+        """Подписки и посты сосредоточены у немногих авторов."""
+        self.assertEqual(User.objects.count(), 40)
+        self.assertEqual(Post.objects.count(), 80)
+        self.assertEqual(Comment.objects.count(), 150)
+        followers = list(User.objects.annotate(
+            count=Count('following')
+        ).values_list('count', flat=True))
+        self.assertGreaterEqual(max(followers), 3 * median(followers))
+
+    def test_scenarios_cover_every_url(self):
+        """Нагрузочный тест проходит по всем URL posts.urls."""
+        names = {f'posts:{pattern.name}' for pattern in urls.urlpatterns}
+        self.assertEqual(
+            {scenario.url_name for scenario in build_scenarios()}, names
+        )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(
+            [percentile(values, p) for p in (50, 95, 99)], [50, 95, 99]
+        )
+
+    def test_report_is_saved_and_compared(self):
+        """Отчет сохраняется, следующий запуск сравнивается с ним."""
+        call_command('run_benchmark', '--iterations', '2', '--warmup', '0',
+                     stdout=StringIO())
+        out = StringIO()
+        call_command('run_benchmark', '--iterations', '2', '--warmup', '0',
+                     '--scenario', 'index', stdout=out)
+        self.assertIn('Сравнение с', out.getvalue())
+        reports = sorted(os.listdir(settings.BENCHMARK_DIR))
+        with open(os.path.join(settings.BENCHMARK_DIR, reports[0])) as f:
+            report = json.load(f)
+        self.assertEqual(report['dataset']['posts'], 80)
+        for name, result in report['scenarios'].items():
+            with self.subTest(scenario=name):
+                self.assertLess(max(result['statuses']), 500)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertIsNotNone(result['queries'])
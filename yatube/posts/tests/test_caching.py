@@ -0,0 +1,414 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import (Client, SimpleTestCase, TestCase,
+                         TransactionTestCase)
+from django.test.signals import template_rendered
+from django.urls import reverse
+
+from ..caching import ALL, generations, get_or_compute, shared_cache
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='test-title',
+            slug='test-slug',
+            description='test-desc',
+        )
+        cls.other_group = Group.objects.create(
+            title='other-title',
+            slug='other-slug',
+            description='other-desc',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Первый пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_anonymous_index_is_served_from_cache(self):
+        """Повторный анонимный запрос не обращается к базе."""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_write_is_visible_on_next_request(self):
+        """Новый пост виден сразу, несмотря на кэш."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.authorized_client.get(url)
+        Post.objects.create(author=self.user, text='Свежий пост')
+        for client in (self.guest_client, self.authorized_client):
+            with self.subTest(client=client):
+                self.assertContains(client.get(url), 'Свежий пост')
+
+    def test_personal_header_is_not_shared(self):
+        """Страница гостя из кэша не отдается вошедшему пользователю."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Пользователь: auth')
+
+    def warm_up(self, *urls):
+        for url in urls:
+            for client in (self.guest_client, self.authorized_client):
+                client.get(url)
+
+    def test_post_edit_is_visible_on_group_and_profile_pages(self):
+        """Правка поста сразу видна на страницах групп и профиля."""
+        group_url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        other_url = reverse('posts:group_list', kwargs={'slug': 'other-slug'})
+        profile_url = reverse('posts:profile', kwargs={'username': 'auth'})
+        self.warm_up(group_url, other_url, profile_url)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Исправленный пост', 'group': self.other_group.id},
+        )
+        for client in (self.guest_client, self.authorized_client):
+            with self.subTest(client=client):
+                self.assertNotContains(client.get(group_url), 'Первый пост')
+                self.assertContains(client.get(other_url),
+                                    'Исправленный пост')
+                self.assertContains(client.get(profile_url),
+                                    'Исправленный пост')
+
+    def test_fragments_of_objects_with_same_generation(self):
+        """Фрагменты разных групп, авторов и постов не путаются,
+        даже если их поколения совпали."""
+        other_user = User.objects.create_user(username='other')
+        other_post = Post.objects.create(
+            author=other_user, text='Пост другой группы',
+            group=self.other_group,
+        )
+        pages = (
+            ('posts:group_list', {'slug': 'test-slug'},
+             {'slug': 'other-slug'}, 'Пост другой группы'),
+            ('posts:profile', {'username': 'auth'}, {'username': 'other'},
+             'Пост другой группы'),
+            ('posts:post_detail', {'post_id': self.post.pk},
+             {'post_id': other_post.pk}, 'Комментарий другого поста'),
+        )
+        other_post.comments.create(author=other_user,
+                                   text='Комментарий другого поста')
+        with mock.patch('posts.caching._initial_generation',
+                        return_value=1):
+            # Поколения заводятся заново, у всех объектов — одинаковые.
+            cache.clear()
+            for name, first, second, text in pages:
+                with self.subTest(page=name):
+                    self.authorized_client.get(reverse(name, kwargs=first))
+                    self.assertContains(
+                        self.authorized_client.get(reverse(name,
+                                                           kwargs=second)),
+                        text,
+                    )
+
+    def test_group_rename_and_delete_update_profile(self):
+        """Ссылка на группу в профиле автора меняется вместе с группой."""
+        profile_url = reverse('posts:profile', kwargs={'username': 'auth'})
+        self.warm_up(profile_url)
+        etag = self.guest_client.get(profile_url)['ETag']
+        self.group.slug = 'renamed-slug'
+        self.group.save()
+        response = self.guest_client.get(profile_url,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        for client in (self.guest_client, self.authorized_client):
+            with self.subTest(client=client):
+                response = client.get(profile_url)
+                self.assertContains(response, '/group/renamed-slug/')
+                self.assertNotContains(response, '/group/test-slug/')
+        self.group.delete()
+        for client in (self.guest_client, self.authorized_client):
+            with self.subTest(client=client):
+                self.assertNotContains(client.get(profile_url),
+                                       '/group/renamed-slug/')
+
+    def test_user_rename_updates_pages(self):
+        """Новое имя автора видно в лентах, комментатора — под
+        комментарием."""
+        commenter = User.objects.create_user(username='commenter')
+        self.post.comments.create(author=commenter, text='Комментарий')
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        self.warm_up(*urls)
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        commenter.username = 'renamed-commenter'
+        commenter.save()
+        for url, text in zip(urls, ('Переименованный', 'Переименованный',
+                                    'renamed-commenter')):
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), text)
+
+    def test_login_keeps_pages_cached(self):
+        """Вход пользователя (last_login) не сбрасывает кэш страниц."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        User.objects.create_user(username='reader', password='password')
+        Client().login(username='reader', password='password')
+        with self.assertNumQueries(0):
+            self.guest_client.get(url)
+
+    def test_comment_is_visible_on_post_page(self):
+        """Новый комментарий сразу виден на странице поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.warm_up(url)
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Свежий комментарий'},
+        )
+        for client in (self.guest_client, self.authorized_client):
+            with self.subTest(client=client):
+                self.assertContains(client.get(url), 'Свежий комментарий')
+
+    def test_new_post_updates_author_count_on_post_page(self):
+        """Счетчик постов автора на странице поста не устаревает."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.warm_up(url)
+        Post.objects.create(author=self.user, text='Второй пост')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['author_posts_count'], 2)
+
+
+class StampedeTests(SimpleTestCase):
+    """Нагрузочный тест: пересчет один на каждое истечение кэша."""
+
+    CONCURRENT_REQUESTS = 16
+    EXPIRIES = 5
+    TIMEOUT = 20
+
+    def setUp(self):
+        cache.clear()
+        self.clock = 1000.0
+        self.renders = []
+
+    def tearDown(self):
+        cache.clear()
+
+    def render(self):
+        # Запросы к базе и рендер шаблона.
+        self.renders.append(self.clock)
+        time.sleep(0.05)
+        return len(self.renders)
+
+    def hit_concurrently(self):
+        start = threading.Barrier(self.CONCURRENT_REQUESTS)
+        results = []
+
+        def request():
+            start.wait()
+            results.append(
+                get_or_compute('stampede', self.render, self.TIMEOUT)
+            )
+
+        threads = [threading.Thread(target=request)
+                   for _ in range(self.CONCURRENT_REQUESTS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_recompute_per_expiry(self):
+        with mock.patch('posts.caching.time.time', lambda: self.clock):
+            self.assertEqual(self.hit_concurrently(),
+                             [1] * self.CONCURRENT_REQUESTS)
+            for expiry in range(2, self.EXPIRIES + 2):
+                self.clock += self.TIMEOUT + 1
+                results = self.hit_concurrently()
+                self.assertEqual(len(self.renders), expiry)
+                # Пока страница пересчитывается, отдается прежняя.
+                self.assertLessEqual(set(results), {expiry - 1, expiry})
+                self.assertEqual(self.hit_concurrently(),
+                                 [expiry] * self.CONCURRENT_REQUESTS)
+
+    def test_early_refresh_recomputes(self):
+        """Раннее обновление до срока пересчитывает значение."""
+        with mock.patch('posts.caching.time.time', lambda: self.clock):
+            self.assertEqual(
+                get_or_compute('stampede', self.render, self.TIMEOUT), 1
+            )
+            expires_at = cache.get('stampede')[1]
+            self.clock = expires_at - 1
+            with mock.patch('posts.caching._should_refresh',
+                            return_value=True):
+                self.assertEqual(
+                    get_or_compute('stampede', self.render, self.TIMEOUT), 2
+                )
+        self.assertEqual(len(self.renders), 2)
+        self.assertGreater(cache.get('stampede')[1], expires_at)
+
+    def test_waiter_keeps_foreign_lock(self):
+        """Не дождавшийся значения запрос считает сам, но чужую
+        блокировку не снимает."""
+        locks = shared_cache()
+        locks.set('stampede:lock', 'other', None)
+        with mock.patch('posts.caching.RECOMPUTE_LOCK_TIMEOUT', 0.1):
+            self.assertEqual(
+                get_or_compute('stampede', self.render, self.TIMEOUT), 1
+            )
+        self.assertEqual(locks.get('stampede:lock'), 'other')
+
+
+class ConcurrentPageTests(TransactionTestCase):
+    """Нагрузочный тест: одновременные анонимные запросы к остывшей
+    странице рендерят ее один раз."""
+
+    CONCURRENT_REQUESTS = 8
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='auth')
+        Post.objects.create(author=user, text='Пост')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_cold_page_is_rendered_once(self):
+        url = reverse('posts:index')
+        # Поколения заводятся заранее, чтобы запросы не спорили о них.
+        generations((ALL, 0))
+        renders = []
+        start = threading.Barrier(self.CONCURRENT_REQUESTS)
+        statuses = []
+
+        def on_render(sender, template, **kwargs):
+            if template.name == 'posts/index.html':
+                renders.append(template.name)
+
+        def request():
+            start.wait()
+            try:
+                statuses.append(Client().get(url).status_code)
+            finally:
+                connection.close()
+
+        template_rendered.connect(on_render)
+        try:
+            threads = [threading.Thread(target=request)
+                       for _ in range(self.CONCURRENT_REQUESTS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            template_rendered.disconnect(on_render)
+        self.assertEqual(statuses, [200] * self.CONCURRENT_REQUESTS)
+        self.assertEqual(len(renders), 1)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_page_is_not_rendered(self):
+        """Неизмененная страница — 304 без запросов к базе."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_pages_are_revalidated_and_private(self):
+        """Страница и ответ 304 требуют проверки и не кэшируются прокси."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        not_modified = self.client.get(url,
+                                       HTTP_IF_NONE_MATCH=response['ETag'])
+        for checked in (response, not_modified):
+            with self.subTest(status=checked.status_code):
+                self.assertEqual(
+                    set(checked['Cache-Control'].split(', ')),
+                    {'private', 'no-cache'},
+                )
+
+    def test_writes_change_validators(self):
+        """Новый пост, правка и комментарий меняют ETag своих страниц."""
+        detail_url = reverse('posts:post_detail',
+                             kwargs={'post_id': self.post.id})
+        profile_url = reverse('posts:profile', kwargs={'username': 'author'})
+        writes = (
+            (reverse('posts:index'), lambda: Post.objects.create(
+                author=self.reader, text='Новый пост')),
+            (profile_url, lambda: Post.objects.filter(pk=self.post.pk)
+                .first().save()),
+            (detail_url, lambda: self.post.comments.create(
+                author=self.reader, text='Комментарий')),
+        )
+        for url, write in writes:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                write()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_profile_for_follower(self):
+        """После подписки кнопка на странице автора не берется из кэша."""
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.assertEqual(self.revalidate(url, client).status_code, 304)
+        etag = client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified(self):
+        """Last-Modified отдается, когда секунда записи прошла."""
+        url = reverse('posts:index')
+        # Отметка последней записи заводится при первом запросе.
+        self.client.get(url)
+        later = time.time() + 5
+        with mock.patch('posts.caching.time.time', return_value=later):
+            last_modified = self.client.get(url)['Last-Modified']
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+            self.assertEqual(response.status_code, 304)
+        with mock.patch('posts.caching.time.time', return_value=later + 5):
+            Post.objects.create(author=self.author, text='Новый пост')
+        with mock.patch('posts.caching.time.time', return_value=later + 10):
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..views import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('posts:post_detail',
+                           kwargs={'post_id': self.post.id})
+
+    def tearDown(self):
+        cache.clear()
+
+    def add_comments(self, count):
+        Comment.objects.bulk_create(
+            Comment(
+                post=self.post,
+                author=User.objects.create_user(username=f'commenter{i}'),
+                text=f'Комментарий {i}',
+            )
+            for i in range(Comment.objects.count(),
+                           Comment.objects.count() + count)
+        )
+
+    def count_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        return len(queries)
+
+    def test_detail_queries_do_not_grow_with_thread(self):
+        """Число запросов страницы поста не растет с числом комментариев."""
+        self.add_comments(1)
+        self.client.get(self.url)
+        few_comments = self.count_queries()
+        self.add_comments(COMMENTS_PER_PAGE * 2)
+        self.assertEqual(self.count_queries(), few_comments)
+
+    def test_long_thread_is_paginated(self):
+        """Длинная ветка отдается страницами, остальное — через JSON."""
+        self.add_comments(COMMENTS_PER_PAGE + 5)
+        response = self.client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertEqual(response.context['author_posts_count'], 1)
+        more = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'cursor': comments.next_cursor},
+        ).json()
+        self.assertEqual(len(more['comments']), 5)
+        self.assertEqual(more['comments'][0]['text'],
+                         f'Комментарий {COMMENTS_PER_PAGE}')
+        self.assertIsNone(more['next_cursor'])
+
+    def test_comments_of_unknown_post_are_not_found(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..counters import get_post_count
+from ..models import Group, Post, PostCounter
+
+User = get_user_model()
+
+
+class PostCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counter')
+        cls.group = Group.objects.create(
+            title='test-title',
+            slug='test-slug',
+            description='test-desc',
+        )
+        cls.other_group = Group.objects.create(
+            title='other-title',
+            slug='other-slug',
+            description='other-desc',
+        )
+        Post.objects.create(author=cls.user, text='Пост', group=cls.group)
+
+    def counts(self):
+        return (
+            get_post_count(),
+            get_post_count(PostCounter.AUTHOR, self.user.pk),
+            get_post_count(PostCounter.GROUP, self.group.pk),
+            get_post_count(PostCounter.GROUP, self.other_group.pk),
+        )
+
+    def test_counters_follow_create_edit_delete(self):
+        """Сигналы поддерживают счетчики в актуальном состоянии."""
+        self.assertEqual(self.counts(), (1, 1, 1, 0))
+        post = Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group
+        )
+        self.assertEqual(self.counts(), (2, 2, 2, 0))
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.counts(), (2, 2, 1, 1))
+        post.delete()
+        self.assertEqual(self.counts(), (1, 1, 1, 0))
+
+    def test_reconcile_fixes_drift(self):
+        """Команда сверки исправляет разошедшиеся счетчики."""
+        self.counts()
+        Post.objects.bulk_create([Post(author=self.user, text='Без сигнала')])
+        self.assertEqual(self.counts(), (1, 1, 1, 0))
+        call_command('reconcile_post_counts', stdout=StringIO())
+        self.assertEqual(self.counts(), (2, 2, 1, 0))
+
+    def test_profile_reads_counter(self):
+        """Профиль берет число постов из счетчика без COUNT(*)."""
+        client = Client()
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url + '?page=1')
+        self.assertEqual(response.context['posts_count'], 1)
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -78,9 +79,11 @@ class PostsViewsTests(TestCase):
         )
         self.assertEqual(Post.objects.count(), posts_count + summ_post)
         # Проверяем, существует ли в БД пост с картинкой
+        # (она хранится под хэшем содержимого)
+        digest = hashlib.sha256(small_gif).hexdigest()
         self.assertTrue(Post.objects.filter(
             text='New text',
-            image='posts/small.gif',
+            image=f'posts/{digest[:2]}/{digest}.gif',
         ).exists())
 
     def test_post_edit(self):
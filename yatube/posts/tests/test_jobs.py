@@ -0,0 +1,170 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import jobs
+from ..counters import get_post_count
+from ..models import (BulkJob, BulkJobItem, Comment, Group, Post,
+                      PostCounter)
+from ..search import get_backend, terms
+
+User = get_user_model()
+
+
+# Транзакционный тест: задание ставится в очередь только после коммита.
+@override_settings(BULK_JOB_WORKERS=0, BULK_JOB_BATCH_SIZE=2)
+class BulkJobTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(author=self.admin, group=self.group,
+                                text=f'Пост {i}')
+            for i in range(5)
+        ]
+        for post in self.posts:
+            Comment.objects.create(post=post, author=self.admin,
+                                   text='Комментарий')
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def tearDown(self):
+        cache.clear()
+
+    def run_action(self, action, **data):
+        return self.client.post(self.url, {
+            'action': action,
+            '_selected_action': [post.pk for post in self.posts[:4]],
+            **data,
+        }, follow=True)
+
+    def test_delete_action_runs_as_job(self):
+        """Удаление выполняется заданием, с комментариями и счетчиками."""
+        get_post_count(PostCounter.GROUP, self.group.pk)
+        response = self.run_action('delete_in_background')
+        job = BulkJob.objects.get()
+        self.assertContains(response, str(job))
+        self.assertEqual((job.status, job.done, job.total, job.progress),
+                         (BulkJob.DONE, 4, 4, 100))
+        self.assertEqual(list(Post.objects.all()), [self.posts[4]])
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(get_post_count(), 1)
+        self.assertEqual(get_post_count(PostCounter.GROUP, self.group.pk), 1)
+
+    def test_request_deletes_nothing_itself(self):
+        """Действие в запросе только ставит задание в очередь."""
+        with mock.patch.object(jobs, 'run_job') as run_job:
+            self.run_action('delete_in_background')
+        job = BulkJob.objects.get()
+        run_job.assert_called_once_with(job.pk)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(
+            list(job.items.order_by('post_id').values_list('post_id',
+                                                           flat=True)),
+            [post.pk for post in self.posts[:4]],
+        )
+
+    def test_batch_reads_only_its_items(self):
+        """Пачка читает из выбора только свои id, после конца выбор
+        удаляется."""
+        with mock.patch.object(jobs, 'run_job'):
+            self.run_action('delete_in_background')
+        job = BulkJob.objects.get()
+        with CaptureQueriesContext(connection) as queries:
+            jobs.run_batch(job)
+        self.assertIn('LIMIT 2', queries[0]['sql'])
+        self.assertEqual(job.last_id, self.posts[1].pk)
+        jobs.run_job(job.pk)
+        self.assertFalse(BulkJobItem.objects.exists())
+
+    def test_comments_are_deleted_in_chunks(self):
+        """Комментарии пачки удаляются кусками, без загрузки объектов
+        и без сдвига поколений и правки индекса на каждый."""
+        post = self.posts[0]
+        for i in range(4):
+            Comment.objects.create(post=post, author=self.admin,
+                                   text='Лишний комментарий')
+        with mock.patch.object(jobs, 'run_job'):
+            self.run_action('delete_in_background')
+        job = BulkJob.objects.get()
+        deleted = []
+
+        def count_deleted(sender, instance, **kwargs):
+            deleted.append(instance.pk)
+
+        post_delete.connect(count_deleted, sender=Comment)
+        self.addCleanup(post_delete.disconnect, count_deleted,
+                        sender=Comment)
+        with mock.patch('posts.caching.bump_generations') as bump, \
+                CaptureQueriesContext(connection) as queries:
+            jobs.run_batch(job)
+        self.assertEqual(deleted, [])
+        self.assertEqual(bump.call_count, 2)
+        chunks = [query['sql'] for query in queries
+                  if 'FROM "posts_comment"' in query['sql']
+                  and 'LIMIT 2' in query['sql']]
+        # 6 комментариев по 2 и пустой кусок в конце.
+        self.assertEqual(len(chunks), 4)
+        self.assertFalse(Comment.objects.filter(post=post).exists())
+        self.assertEqual(get_backend().search(terms('Лишний'), None, 10),
+                         [])
+
+    def test_move_to_group_updates_counters_and_pages(self):
+        """Перенос в группу сдвигает счетчики и сбрасывает кэш страниц."""
+        get_post_count(PostCounter.GROUP, self.group.pk)
+        get_post_count(PostCounter.GROUP, self.other_group.pk)
+        group_url = reverse('posts:group_list',
+                            kwargs={'slug': self.other_group.slug})
+        self.client.get(group_url)
+        self.run_action('move_to_group', group=self.other_group.pk)
+        self.assertEqual(BulkJob.objects.get().status, BulkJob.DONE)
+        self.assertEqual(
+            Post.objects.filter(group=self.other_group).count(), 4
+        )
+        self.assertEqual(get_post_count(PostCounter.GROUP, self.group.pk), 1)
+        self.assertEqual(
+            get_post_count(PostCounter.GROUP, self.other_group.pk), 4
+        )
+        response = self.client.get(group_url)
+        self.assertEqual(len(response.context['page_obj']), 4)
+
+    def test_failed_job_resumes_from_last_batch(self):
+        """Упавшее задание продолжается с последней завершенной пачки."""
+        delete = jobs.ACTIONS[BulkJob.DELETE]
+        calls = []
+
+        def flaky_delete(job, post_ids):
+            calls.append(post_ids)
+            if len(calls) == 2:
+                raise RuntimeError('сбой')
+            delete(job, post_ids)
+
+        with mock.patch.dict(jobs.ACTIONS, {BulkJob.DELETE: flaky_delete}):
+            with self.assertLogs('posts.jobs', 'ERROR'):
+                self.run_action('delete_in_background')
+        job = BulkJob.objects.get()
+        self.assertEqual((job.status, job.done, job.error),
+                         (BulkJob.FAILED, 2, 'сбой'))
+        # Вторая пачка откатилась целиком.
+        self.assertEqual(Post.objects.count(), 3)
+        call_command('run_bulk_jobs', '--retry-failed', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.done), (BulkJob.DONE, 4))
+        self.assertEqual(list(Post.objects.all()), [self.posts[4]])
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import migrations
+from django.db.migrations.loader import MigrationLoader
+from django.test import SimpleTestCase, TestCase
 
 from ..models import Group, Post
 
@@ -30,3 +32,19 @@ class PostModelTest(TestCase):
         self.assertEqual(post_name, post.text[:15],
                          'Тест поста кривой, либо название')
         self.assertEqual(group_name, group.title, 'Тест группы кривой, чини')
+
+
+class InitialMigrationTest(SimpleTestCase):
+    def test_initial_migration_is_baseline_schema(self):
+        """0001 — исходные таблицы: база без миграций обновляется
+        через migrate --fake-initial."""
+        migration = MigrationLoader(None).get_migration('posts',
+                                                        '0001_initial')
+        self.assertEqual(
+            {operation.name for operation in migration.operations},
+            {'Group', 'Post', 'Comment', 'Follow'},
+        )
+        self.assertTrue(all(
+            isinstance(operation, migrations.CreateModel)
+            for operation in migration.operations
+        ))
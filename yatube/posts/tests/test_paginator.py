@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from ..models import Post, Group
 
@@ -73,3 +76,58 @@ class PaginatorViewsTests(TestCase):
                     kwargs={'username':
                             PaginatorViewsTests.user.username}) + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class CursorPaginatorViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cursor')
+        cls.group = Group.objects.create(
+            title='cursor-title',
+            slug='cursor',
+            description='cursor-desc',
+        )
+        bulk_post = []
+        for i in range(MAGIC_VALUE):
+            bulk_post.append(Post(text=f'Текстовый текст {i}',
+                                  group=cls.group,
+                                  author=cls.user))
+        Post.objects.bulk_create(bulk_post)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        """По курсорам можно пройти ленту вперед и назад."""
+        url = reverse('posts:group_list',
+                      kwargs={'slug': CursorPaginatorViewsTests.group.slug})
+        first_page = self.client.get(url).context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        second_page = self.client.get(
+            url + '?cursor=' + first_page.next_cursor).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        back_page = self.client.get(
+            url + '?cursor=' + second_page.previous_cursor
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_cursor_page_has_no_count_query(self):
+        """Курсорная страница не выполняет COUNT(*) и OFFSET."""
+        url = reverse('posts:group_list',
+                      kwargs={'slug': CursorPaginatorViewsTests.group.slug})
+        first_page = self.client.get(url).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url + '?cursor=' + first_page.next_cursor)
+        for query in queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'])
+                self.assertNotIn('OFFSET', query['sql'])
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор не ломает страницу."""
+        response = self.client.get(reverse('posts:index') + '?cursor=xxx')
+        self.assertEqual(len(response.context['page_obj']), 10)
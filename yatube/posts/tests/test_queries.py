@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+FEED_SIZE = 10
+
+
+class FeedQueryCountTests(TestCase):
+    """Число запросов ленты не зависит от числа постов на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='test-title',
+            slug='test-slug',
+            description='test-desc',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.create(author=cls.author, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_feeds_have_no_lazy_loads(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            # Первый запрос заводит счетчики постов.
+            self.client.get(url)
+        single_post = {url: self.count_queries(url) for url in urls}
+        for i in range(FEED_SIZE):
+            Post.objects.create(
+                author=User.objects.create_user(username=f'user{i}'),
+                text=f'Пост {i}',
+                group=Group.objects.create(
+                    title=f'title{i}', slug=f'slug{i}', description='desc'
+                ),
+            )
+            Post.objects.create(
+                author=self.author, text=f'Пост {i}', group=self.group
+            )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), single_post[url])
+
+
+class ExplainFeedsCommandTests(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Ни один запрос лент не читает таблицу целиком."""
+        user = User.objects.create_user(username='auth')
+        Post.objects.create(author=user, text='Пост')
+        Follow.objects.create(
+            user=User.objects.create_user(username='reader'), author=user
+        )
+        call_command('explain_feeds', stdout=StringIO())
@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SEARCH_TABLE, search
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class RussianStemmerTests(SimpleTestCase):
+    def test_word_forms_share_stem(self):
+        cases = {
+            'кот': ('кот', 'коты', 'котами'),
+            'книг': ('книги', 'книгами', 'книга'),
+            'красив': ('красивая', 'красивыми'),
+            'важн': ('важнейшие',),
+            'елк': ('ёлками',),
+        }
+        for expected, words in cases.items():
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            author=self.user, text='Мой кот любит рыбу'
+        )
+
+    def test_finds_word_forms_with_highlight(self):
+        """Находит пост по другой форме слова и выделяет совпадение."""
+        results, next_cursor = search('коты')
+        self.assertEqual([result.post for result in results], [self.post])
+        self.assertEqual(results[0].snippet,
+                         'Мой <mark>кот</mark> любит рыбу')
+        self.assertIsNone(next_cursor)
+
+    def test_index_follows_writes(self):
+        """Индекс обновляется при правке, удалении и комментариях."""
+        comment = self.post.comments.create(
+            author=self.user, text='Коту нужна рыба'
+        )
+        results, _ = search('рыбой')
+        self.assertEqual(
+            {(result.kind, result.comment) for result in results},
+            {('post', None), ('comment', comment)},
+        )
+        self.post.text = 'Моя собака'
+        self.post.save()
+        self.assertEqual(search('собаки')[0][0].post, self.post)
+        self.assertEqual([result.kind for result in search('рыба')[0]],
+                         ['comment'])
+        self.post.delete()
+        self.assertEqual(search('рыба'), ([], None))
+
+    def test_ranking_and_cursor_pagination(self):
+        """Релевантные выше; курсор ведет по страницам без повторов."""
+        best = Post.objects.create(author=self.user, text='кот кот кот')
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'кот и пес {i} с длинным текстом')
+            for i in range(12)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        first_page, cursor = search('кот', limit=10)
+        self.assertEqual(first_page[0].post, best)
+        second_page, cursor_after = search('кот', cursor, limit=10)
+        self.assertIsNone(cursor_after)
+        found = [result.post.pk for result in first_page + second_page]
+        self.assertEqual(len(found), 14)
+        self.assertEqual(len(set(found)), 14)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        self.assertEqual(search('кот'), ([], None))
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search('кот')[0]), 1)
+
+    def test_search_page(self):
+        response = Client().get(reverse('posts:search'), {'q': 'котов'})
+        self.assertContains(response, '<mark>кот</mark>')
+        self.assertContains(
+            response, reverse('posts:post_detail', args=(self.post.id,))
+        )
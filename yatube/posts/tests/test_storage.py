@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import images, thumbnails
+from ..models import Post
+from .test_thumbnails import OTHER_GIF, uploaded_gif
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_STATE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   MEDIA_STATE_DIR=TEMP_STATE_DIR, THUMBNAIL_WORKERS=0)
+class ContentAddressedStorageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_STATE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def publish(self, username, image):
+        client = Client()
+        client.force_login(User.objects.create_user(username=username))
+        client.post(reverse('posts:post_create'),
+                    data={'text': 'Пост', 'image': image})
+        return Post.objects.get(author__username=username)
+
+    def stored(self, name):
+        return os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name))
+
+    def test_duplicates_share_file_and_renditions(self):
+        """Одинаковая картинка хранится и обрабатывается один раз."""
+        first = self.publish('first', uploaded_gif('small.gif'))
+        with mock.patch.object(thumbnails, 'make_renditions') as make:
+            second = self.publish('second', uploaded_gif('copy.gif'))
+        make.assert_not_called()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.thumbnail, second.thumbnail)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory),
+                         [os.path.basename(first.image.name)])
+
+    def test_state_is_kept_outside_media_root(self):
+        """Блокировка и брони загрузок не попадают в раздаваемый
+        MEDIA_ROOT."""
+        self.publish('first', uploaded_gif('small.gif'))
+        self.publish('second', uploaded_gif('copy.gif'))
+        self.assertEqual(sorted(os.listdir(TEMP_STATE_DIR)),
+                         ['images.lock', 'reserved.json'])
+        for directory, _, files in os.walk(TEMP_MEDIA_ROOT):
+            with self.subTest(directory=directory):
+                self.assertFalse([name for name in files
+                                  if name.startswith('.')
+                                  or name.endswith(('.lock', '.json'))])
+
+    def test_file_is_deleted_with_last_post(self):
+        """Файл и копии удаляются вместе с последним постом."""
+        first = self.publish('first', uploaded_gif('small.gif'))
+        second = self.publish('second', uploaded_gif('copy.gif'))
+        name = first.image.name
+        first.delete()
+        self.assertTrue(self.stored(name))
+        second.delete()
+        self.assertFalse(self.stored(name))
+        self.assertEqual(default_storage.listdir(images.RENDITIONS_DIR)[1],
+                         [])
+
+    def test_replaced_image_is_released(self):
+        """Замененная при правке картинка удаляется, если больше не нужна."""
+        post = self.publish('auth', uploaded_gif('small.gif'))
+        old_name = post.image.name
+        client = Client()
+        client.force_login(post.author)
+        client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Правка',
+                  'image': uploaded_gif('other.gif', OTHER_GIF)},
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(self.stored(old_name))
+        self.assertTrue(self.stored(post.image.name))
+
+    def test_reupload_during_release_keeps_file(self):
+        """Картинка, загруженная заново до сохранения поста,
+        не удаляется вместе с последним прежним постом."""
+        post = self.publish('first', uploaded_gif('small.gif'))
+        name = post.image.name
+        storage = Post._meta.get_field('image').storage
+        # Загрузка того же файла: пост с ним еще не сохранен.
+        self.assertEqual(storage.save('posts/copy.gif',
+                                      uploaded_gif('copy.gif')), name)
+        with mock.patch('posts.thumbnails.threading.Timer') as timer:
+            post.delete()
+        self.assertTrue(self.stored(name))
+        wait, release, args = timer.call_args[0]
+        self.assertLessEqual(wait, storage.RESERVE_SECONDS)
+        # После срока брони файл без ссылок удаляется.
+        with mock.patch.object(storage, 'RESERVE_SECONDS', 0):
+            storage.save('posts/copy.gif', uploaded_gif('copy.gif'))
+        release(*args)
+        self.assertFalse(self.stored(name))
+
+    def test_renditions_are_deleted_by_name(self):
+        """Копии удаляются по известным именам, без обхода каталога."""
+        post = self.publish('first', uploaded_gif('small.gif'))
+        with mock.patch.object(default_storage, 'listdir') as listdir:
+            post.delete()
+        listdir.assert_not_called()
+        self.assertEqual(default_storage.listdir(images.RENDITIONS_DIR)[1],
+                         [])
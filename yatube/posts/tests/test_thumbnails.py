@@ -0,0 +1,172 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images, thumbnails
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+# Та же картинка другого цвета.
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\x00\x00')
+
+
+def uploaded_gif(name, content=SMALL_GIF):
+    return SimpleUploadedFile(
+        name=name, content=content, content_type='image/gif'
+    )
+
+
+# Транзакционный тест: превью ставится в очередь только после коммита.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с картинкой', 'image': uploaded_gif('small.gif'),
+        })
+        return Post.objects.get()
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_feed_renders_precomputed_thumbnail(self):
+        """Лента берет готовый URL превью и не открывает картинки."""
+        post = self.create_post()
+        self.assertTrue(post.thumbnail)
+        with mock.patch('PIL.Image.open', side_effect=AssertionError):
+            response = Client().get(reverse('posts:index'))
+        self.assertContains(response, post.thumbnail)
+        self.assertContains(response, 'type="image/webp"')
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_new_image_replaces_thumbnail(self):
+        """Новая картинка при правке получает свое превью."""
+        post = self.create_post()
+        old_image, old_thumbnail = post.image.name, post.thumbnail
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Правка',
+                  'image': uploaded_gif('other.gif', OTHER_GIF)},
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.thumbnail, old_thumbnail)
+        self.assertTrue(post.thumbnail)
+        self.assertIsNone(thumbnails.render_thumbnail(post.id, old_image))
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_deleted_post_gets_no_renditions(self):
+        """Пост удален, пока кодировались копии: файлы не пишутся."""
+        post = self.create_post()
+        encode = images._encode
+
+        def delete_post(*args, **kwargs):
+            Post.objects.filter(pk=post.pk).delete()
+            return encode(*args, **kwargs)
+
+        with mock.patch.object(images, '_encode', side_effect=delete_post):
+            self.assertIsNone(
+                thumbnails.render_thumbnail(post.id, post.image.name)
+            )
+        self.assertEqual(default_storage.listdir(images.RENDITIONS_DIR)[1],
+                         [])
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_post_changed_while_writing_keeps_its_renditions(self):
+        """Картинку заменили или пост удалили, пока писались файлы:
+        копии старой картинки в пост не попадают, ошибки нет."""
+        changes = (
+            ('replaced', lambda pk: Post.objects.filter(pk=pk).update(
+                image='posts/other.gif', thumbnail='')),
+            ('deleted', lambda pk: Post.objects.filter(pk=pk).delete()),
+        )
+        for name, change in changes:
+            with self.subTest(change=name):
+                Post.objects.all().delete()
+                post = self.create_post()
+                save = images._save
+
+                def change_post(*args, **kwargs):
+                    change(post.pk)
+                    return save(*args, **kwargs)
+
+                with mock.patch.object(images, '_save',
+                                       side_effect=change_post):
+                    self.assertIsNone(
+                        thumbnails.render_thumbnail(post.id, post.image.name)
+                    )
+                self.assertFalse(
+                    Post.objects.filter(pk=post.pk).exclude(thumbnail='')
+                )
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_thumbnail_is_made_by_worker_pool(self):
+        """Ответ на публикацию не ждет превью: его делает пул потоков."""
+        with mock.patch.object(thumbnails, '_executor', None):
+            post = self.create_post()
+            thumbnails._get_executor().shutdown(wait=True)
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_large_photo_gets_responsive_renditions(self):
+        """Большое фото: несколько ширин, WebP и никаких метаданных."""
+        exif = Image.Exif()
+        exif[0x010E] = 'secret'
+        buffer = io.BytesIO()
+        Image.new('RGB', (2000, 1000)).save(
+            buffer, 'JPEG', exif=exif.tobytes()
+        )
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'Фото',
+            'image': SimpleUploadedFile('photo.jpg', buffer.getvalue(),
+                                        content_type='image/jpeg'),
+        })
+        post = Post.objects.get()
+        for srcset, extension in ((post.image_srcset, 'jpg'),
+                                  (post.image_webp_srcset, 'webp')):
+            with self.subTest(extension=extension):
+                candidates = dict(
+                    reversed(item.split()) for item in srcset.split(', ')
+                )
+                self.assertEqual(list(candidates), ['480w', '960w', '1440w'])
+                url = candidates['960w']
+                self.assertTrue(url.endswith(extension))
+                name = url[len(settings.MEDIA_URL):]
+                with default_storage.open(name) as file:
+                    rendition = Image.open(file)
+                    self.assertEqual(rendition.size, (960, 339))
+                    self.assertNotIn('exif', rendition.info)
+        self.assertIn(f'{post.thumbnail} 960w', post.image_srcset)
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_timeline_follows_subscriptions(self):
+        """Лента заполняется при подписке, публикации и очищается
+        при отписке."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), [self.old_post])
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+        new_post.delete()
+        self.assertEqual(self.feed(), [self.old_post])
+        Follow.objects.get(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_feed_does_not_join_follow(self):
+        """Лента подписок читается из TimelineEntry без join с Follow."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            self.feed()
+        for query in queries:
+            self.assertNotIn('"posts_follow"', query['sql'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_on_demand(self):
+        """Посты знаменитостей не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_author_leaving_celebrities_is_backfilled(self):
+        """Когда автор перестает быть знаменитостью, его посты
+        раскладываются по лентам оставшихся подписчиков."""
+        other = User.objects.create_user(username='other')
+        with self.settings(TIMELINE_FANOUT_LIMIT=1):
+            Follow.objects.create(user=self.reader, author=self.author)
+            Follow.objects.create(user=other, author=self.author)
+            new_post = Post.objects.create(author=self.author, text='Новый')
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=new_post).exists()
+            )
+            Follow.objects.get(user=other, author=self.author).delete()
+            self.assertTrue(TimelineEntry.objects.filter(
+                user=self.reader, post=new_post
+            ).exists())
+            self.assertEqual(self.feed(), [new_post, self.old_post])
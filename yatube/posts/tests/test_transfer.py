@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..caching import ALL, AUTHOR, GROUP
+from ..counters import get_post_count
+from ..models import Comment, Follow, Group, Post, PostCounter
+from ..search import search
+from ..transfer import DATASETS
+
+User = get_user_model()
+
+OLD_DATE = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = User.objects.create_user(username='author',
+                                               first_name='Лев')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание, "цитата"'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Кот\nи рыба'
+        )
+        Post.objects.filter(pk=self.post.pk).update(pub_date=OLD_DATE)
+        Post.objects.create(author=self.reader, text='Без группы')
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def snapshot(self):
+        return {
+            dataset: list(model._default_manager.order_by('pk').values_list(
+                *fields
+            ))
+            for dataset, (model, fields) in DATASETS.items()
+        }
+
+    def round_trip(self, extension):
+        expected = self.snapshot()
+        for dataset in DATASETS:
+            call_command('export_data', dataset, '-o',
+                         os.path.join(self.directory, dataset + extension),
+                         '--with-credentials', stderr=StringIO())
+        for model, _ in reversed(list(DATASETS.values())):
+            model._default_manager.all().delete()
+        PostCounter.objects.all().delete()
+        stderr = StringIO()
+        for dataset in DATASETS:
+            call_command('import_data', dataset,
+                         os.path.join(self.directory, dataset + extension),
+                         '--batch-size', '1',
+                         stdout=StringIO(), stderr=stderr)
+        self.assertEqual(self.snapshot(), expected)
+        self.assertIn('posts: 2 строк', stderr.getvalue())
+
+    def test_jsonl_round_trip(self):
+        """Выгрузка и загрузка JSON Lines сохраняют данные и даты."""
+        self.round_trip('.jsonl')
+        self.assertEqual(Post.objects.get(pk=self.post.pk).pub_date,
+                         OLD_DATE)
+
+    def test_csv_round_trip(self):
+        """CSV сохраняет переводы строк, кавычки и пустые группы."""
+        self.round_trip('.csv')
+        self.assertIsNone(Post.objects.get(text='Без группы').group_id)
+
+    def test_import_rebuilds_derived_data(self):
+        """После загрузки пересчитаны счетчики, индекс и ленты."""
+        self.round_trip('.jsonl')
+        self.assertEqual(get_post_count(), 2)
+        self.assertEqual(get_post_count(PostCounter.GROUP, self.group.pk), 1)
+        self.assertEqual(len(search('кот')[0]), 1)
+        self.assertEqual(self.reader.timeline.count(), 1)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertGreater(new_post.pk, self.post.pk)
+
+    def test_credentials_are_not_exported_by_default(self):
+        """Без --with-credentials пароли непригодны, а права сняты."""
+        User.objects.create_superuser('admin', 'admin@example.com',
+                                      'password')
+        path = os.path.join(self.directory, 'users.jsonl')
+        call_command('export_data', 'users', '-o', path, stderr=StringIO())
+        with open(path, encoding='utf-8') as stream:
+            exported = stream.read()
+        self.assertNotIn(User.objects.get(username='admin').password,
+                         exported)
+        User.objects.all().delete()
+        call_command('import_data', 'users', path, stdout=StringIO(),
+                     stderr=StringIO())
+        admin = User.objects.get(username='admin')
+        self.assertFalse(admin.has_usable_password())
+        self.assertFalse(admin.is_staff or admin.is_superuser)
+
+
+# Транзакционный тест: поколения сдвигаются после коммита пачки.
+class ImportCacheTests(TransactionTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def write_posts(self, count):
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as stream:
+            for _ in range(count):
+                stream.write(json.dumps({
+                    'text': 'Загруженный пост', 'author_id': self.author.pk,
+                    'group_id': self.group.pk,
+                    'pub_date': '2030-01-01T00:00:00+00:00',
+                }) + '\n')
+        return path
+
+    def test_import_keeps_cache_and_updates_pages(self):
+        """Загрузка не очищает кэш, а сдвигает поколения страниц."""
+        url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        cache.set('unrelated', 1)
+        self.assertNotContains(self.client.get(url), 'Загруженный пост')
+        path = self.write_posts(1)
+        call_command('import_data', 'posts', path, stdout=StringIO(),
+                     stderr=StringIO())
+        self.assertEqual(cache.get('unrelated'), 1)
+        self.assertContains(self.client.get(url), 'Загруженный пост')
+
+    def test_generations_are_bumped_once_per_batch(self):
+        """Пачка сдвигает ленту, автора и группу по одному разу."""
+        path = self.write_posts(5)
+        with mock.patch('posts.caching._bump') as bump:
+            call_command('import_data', 'posts', path, '--batch-size', '2',
+                         stdout=StringIO(), stderr=StringIO())
+        scopes = {(ALL, 0), (AUTHOR, self.author.pk),
+                  (GROUP, self.group.pk)}
+        self.assertEqual([call.args[0] for call in bump.call_args_list],
+                         [scopes] * 3)
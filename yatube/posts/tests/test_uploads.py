@@ -0,0 +1,97 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def png(size, mode='RGB'):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, 'PNG')
+    return SimpleUploadedFile('image.png', buffer.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    FILE_UPLOAD_TEMP_DIR=TEMP_MEDIA_ROOT,
+)
+class StreamingUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, image, client=None):
+        return (client or self.client).post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': image},
+        )
+
+    def assertRejected(self, response, message):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(message, response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
+
+    def test_valid_image_is_saved(self):
+        """Картинка в пределах лимитов сохраняется в посте."""
+        self.create_post(png((20, 10)))
+        post = Post.objects.get()
+        self.assertEqual(post.image.width, 20)
+
+    @override_settings(POST_IMAGE_MAX_BYTES=1024)
+    def test_large_file_is_rejected(self):
+        """Файл больше лимита отклоняется, не дочитываясь."""
+        image = png((20, 10))
+        image.size = 0
+        image.file = io.BytesIO(image.read() + b'\0' * 2048)
+        self.assertRejected(self.create_post(image), 'не больше')
+
+    def test_decompression_bomb_is_rejected(self):
+        """Маленький файл с огромным разрешением не распаковывается."""
+        bomb = png((10000, 10000), mode='1')
+        self.assertLess(bomb.size, settings.POST_IMAGE_MAX_BYTES)
+        self.assertRejected(self.create_post(bomb), 'разрешение')
+
+    def test_not_an_image_is_rejected(self):
+        """Файл без заголовка картинки отклоняется."""
+        fake = SimpleUploadedFile('image.png', b'not an image',
+                                  content_type='image/png')
+        self.assertRejected(self.create_post(fake), 'правильное')
+
+    def test_csrf_is_still_checked(self):
+        """Замена обработчиков загрузки не отключает проверку CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = self.create_post(png((20, 10)), client)
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(Post.objects.exists())
+
+
+class UploadSettingsTests(SimpleTestCase):
+    def test_temp_dir_is_not_served(self):
+        """Недокачанные файлы лежат вне MEDIA_ROOT и не раздаются."""
+        media_root = os.path.join(settings.MEDIA_ROOT, '')
+        self.assertFalse(os.path.join(settings.FILE_UPLOAD_TEMP_DIR, '')
+                         .startswith(media_root))
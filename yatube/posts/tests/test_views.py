@@ -1,5 +1,5 @@
+import hashlib
 import shutil
-import time
 import tempfile
 
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -41,6 +41,9 @@ class PostsViewsTests(TestCase):
             content=small_gif,
             content_type='image/gif'
         )
+        # Картинка хранится под хэшем содержимого.
+        digest = hashlib.sha256(small_gif).hexdigest()
+        cls.image_name = f'posts/{digest[:2]}/{digest}.gif'
         cls.post = Post.objects.create(
             author=cls.user,
             text='Текстовый текст',
@@ -151,7 +154,7 @@ class PostsViewsTests(TestCase):
         # Проверяет, что поле формы является экземпляром
         # указанного класса
         self.assertEqual(form_field, 'Текстовый текст')
-        self.assertEqual(form_image, 'posts/small.gif')
+        self.assertEqual(form_image, PostsViewsTests.image_name)
 
     def test_index_show_correct_context(self):
         """Шаблон index сформирован с правильным контекстом."""
@@ -168,7 +171,7 @@ class PostsViewsTests(TestCase):
         self.assertEqual(task_author_0, PostsViewsTests.user)
         self.assertEqual(task_author_0, PostsViewsTests.user)
         self.assertEqual(task_group_0, PostsViewsTests.group)
-        self.assertEqual(task_image_0, 'posts/small.gif')
+        self.assertEqual(task_image_0, PostsViewsTests.image_name)
 
     def test_group_list_show_correct_context(self):
         """Шаблон group_list сформирован с правильным контекстом."""
@@ -187,7 +190,7 @@ class PostsViewsTests(TestCase):
         self.assertEqual(task_author_0, PostsViewsTests.user)
         self.assertEqual(task_author_0, PostsViewsTests.user)
         self.assertEqual(task_group_0, PostsViewsTests.group)
-        self.assertEqual(task_image_0, 'posts/small.gif')
+        self.assertEqual(task_image_0, PostsViewsTests.image_name)
 
     def test_profile_show_correct_context(self):
         """Шаблон profile сформирован с правильным контекстом."""
@@ -206,7 +209,7 @@ class PostsViewsTests(TestCase):
         self.assertEqual(task_author_0, PostsViewsTests.user)
         self.assertEqual(task_author_0, PostsViewsTests.user)
         self.assertEqual(task_group_0, PostsViewsTests.group)
-        self.assertEqual(task_image_0, 'posts/small.gif')
+        self.assertEqual(task_image_0, PostsViewsTests.image_name)
 
     def test_index_cache(self):
         """Проверка работы кэша на главной странице"""
@@ -221,9 +224,8 @@ class PostsViewsTests(TestCase):
             reverse('posts:index',))
         first_object = response.context['page_obj'][0]
         text_0 = first_object.text
-        # Удаляем новый пост и ждем обновления кэша страницы
+        # Удаляем новый пост: кэш страницы сбрасывается сразу
         Post.objects.get(id=new_post.id).delete()
-        time.sleep(20)
         # Обновляем страницу и берем текст первого в списке поста
         response_new = self.authorized_client.get(
             reverse('posts:index',))
@@ -0,0 +1,143 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import close_old_connections, transaction
+
+from core import metrics
+
+from . import caching
+from .images import delete_renditions, make_renditions
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+RENDITION_FIELDS = ('thumbnail', 'image_srcset', 'image_webp_srcset')
+
+THUMBNAILS = metrics.counter(
+    'yatube_thumbnails_total',
+    'Копии картинок постов: rendered, reused (взяты у поста с той же '
+    'картинкой) или failed.',
+    ('result',),
+)
+THUMBNAIL_SECONDS = metrics.histogram(
+    'yatube_thumbnail_render_seconds', 'Время подготовки копий картинки.',
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def reset_renditions(post):
+    """Забывает копии прежней картинки, пока не готовы новые."""
+    for field in RENDITION_FIELDS:
+        setattr(post, field, '')
+
+
+def render_thumbnail(post_id, image_name):
+    """Готовит копии картинки поста и сохраняет их URL в посте.
+
+    Если картинку успели заменить или пост удалить, копии старой
+    не записываются: это проверяется и до, и после долгого кодирования.
+    """
+    current = Post.objects.filter(pk=post_id, image=image_name)
+    post = current.first()
+    if post is None:
+        return None
+    # Та же картинка у другого поста: копии уже готовы.
+    renditions = Post.objects.filter(image=image_name).exclude(
+        pk=post_id
+    ).exclude(thumbnail='').values(*RENDITION_FIELDS).first()
+    if renditions is None:
+        with THUMBNAIL_SECONDS.time():
+            renditions = make_renditions(post.image, current.exists)
+        if renditions is None:
+            return None
+        THUMBNAILS.inc(result='rendered')
+    else:
+        THUMBNAILS.inc(result='reused')
+    # Условный UPDATE, а не save(): картинку могли заменить или пост
+    # удалить, пока писались файлы. Сигналов сохранения нет, поэтому
+    # поколения страниц поста сдвигаются здесь.
+    if not current.update(**renditions):
+        return None
+    caching.bump_generations(
+        (caching.ALL, 0),
+        (caching.AUTHOR, post.author_id),
+        (caching.GROUP, post.group_id or 0),
+        (caching.POST, post.pk),
+    )
+    return renditions['thumbnail']
+
+
+def release_image(image_name):
+    """Удаляет картинку и ее копии, если на нее не ссылается ни один пост.
+
+    Число ссылок — число постов с этой картинкой, считается по индексу
+    под блокировкой хранилища. Если картинку только что загрузили
+    заново (пост с ней еще не сохранен), удаление откладывается.
+    """
+    storage = Post._meta.get_field('image').storage
+    with storage.locked():
+        if Post.objects.filter(image=image_name).exists():
+            return False
+        wait = storage.reserved_for(image_name)
+        if wait:
+            timer = threading.Timer(wait, _release_later, (image_name,))
+            timer.daemon = True
+            timer.start()
+            return False
+        try:
+            storage.delete(image_name)
+        except SuspiciousFileOperation:
+            # Путь вне MEDIA_ROOT: файл не из нашего хранилища.
+            return False
+    delete_renditions(image_name)
+    return True
+
+
+def _release_later(image_name):
+    try:
+        release_image(image_name)
+    except Exception:
+        logger.exception('Не удалось удалить картинку %s', image_name)
+    finally:
+        close_old_connections()
+
+
+def _run(post_id, image_name):
+    try:
+        render_thumbnail(post_id, image_name)
+    except Exception:
+        THUMBNAILS.inc(result='failed')
+        logger.exception('Не удалось сделать превью поста %s', post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_thumbnail(post):
+    """Ставит копии картинки в очередь после коммита поста.
+
+    Копии делает пул потоков, пока пост уже показывается с исходной
+    картинкой; THUMBNAIL_WORKERS = 0 — сразу, в текущем потоке.
+    """
+    if not post.image:
+        return
+    args = (post.pk, post.image.name)
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: _get_executor().submit(_run, *args))
+    else:
+        transaction.on_commit(lambda: render_thumbnail(*args))
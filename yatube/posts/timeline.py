@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.db.models import Count, F, Q
+
+from .caching import shared_cache
+from .models import Follow, Post, TimelineEntry
+
+CELEBRITIES_KEY = 'timeline:celebrities'
+CELEBRITIES_TIMEOUT = 300
+BATCH_SIZE = 500
+
+
+def celebrity_ids():
+    """Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT.
+
+    Их посты не раскладываются по лентам, а читаются при показе
+    (fan-out on read). Набор меняется только при подписке и отписке,
+    поэтому хранится в кэше.
+    """
+    ids = shared_cache().get(CELEBRITIES_KEY)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.order_by().values('author')
+            .annotate(followers=Count('pk'))
+            .filter(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+            .values_list('author', flat=True)
+        )
+        shared_cache().set(CELEBRITIES_KEY, ids, CELEBRITIES_TIMEOUT)
+    return ids
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Кладет новый пост в ленты подписчиков автора."""
+    if post.author_id in celebrity_ids():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_ids, author_id):
+    """Добавляет в ленты пользователей все посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in user_ids
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def _refresh_celebrity(author_id):
+    """Сбрасывает набор знаменитостей, если автор пересек порог.
+
+    Возвращает True, если автор только что перестал быть знаменитостью:
+    тогда его посты нужно разложить по лентам всех подписчиков.
+    """
+    was_celebrity = author_id in celebrity_ids()
+    is_celebrity = (
+        Follow.objects.filter(author_id=author_id).count()
+        > settings.TIMELINE_FANOUT_LIMIT
+    )
+    if was_celebrity != is_celebrity:
+        shared_cache().delete(CELEBRITIES_KEY)
+    return was_celebrity and not is_celebrity
+
+
+def follow(user_id, author_id):
+    _refresh_celebrity(author_id)
+    if author_id not in celebrity_ids():
+        backfill((user_id,), author_id)
+
+
+def unfollow(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if _refresh_celebrity(author_id):
+        backfill(
+            Follow.objects.filter(
+                author_id=author_id
+            ).values_list('user_id', flat=True),
+            author_id
+        )
+
+
+def follow_feed(user):
+    """Лента подписок пользователя.
+
+    Обычно это одно чтение диапазона по индексу (user, pub_date)
+    таблицы TimelineEntry. Посты знаменитостей, на которых подписан
+    пользователь, добавляются к ленте при чтении.
+    """
+    celebrities = celebrity_ids()
+    if celebrities:
+        celebrities = list(
+            Follow.objects.filter(
+                user=user, author_id__in=celebrities
+            ).values_list('author_id', flat=True)
+        )
+    if not celebrities:
+        return Post.objects.filter(
+            timeline_entries__user=user
+        ).for_feed(feed_date=F('timeline_entries__pub_date'))
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(
+            user=user
+        ).values('post_id'))
+        | Q(author_id__in=celebrities)
+    ).for_feed(feed_date=F('pub_date'))
@@ -0,0 +1,103 @@
+import io
+import os
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+# Сколько начальных байт файла копим, пока Pillow не прочитает
+# заголовок с размерами картинки.
+HEADER_LIMIT = 256 * 1024
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """Пишет загружаемые картинки кусками во временный файл на диске.
+
+    Лимиты проверяются по ходу загрузки: размер файла — на каждом
+    куске, число пикселей — по заголовку, до распаковки картинки.
+    Файл, нарушивший лимит, дальше не читается в память и не пишется
+    на диск, а причина попадает в request.upload_errors.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = settings.POST_IMAGE_MAX_BYTES
+        self.max_pixels = settings.POST_IMAGE_MAX_PIXELS
+        if request is not None and not hasattr(request, 'upload_errors'):
+            request.upload_errors = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+        self.header_checked = False
+        if settings.FILE_UPLOAD_TEMP_DIR:
+            os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra,
+        )
+
+    def header_error(self, final=False):
+        """Ошибка по заголовку картинки или None, если все в порядке."""
+        try:
+            with Image.open(io.BytesIO(self.header)) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            return 'Слишком большое разрешение картинки.'
+        except Exception:
+            # Заголовок еще не пришел целиком или это не картинка.
+            if final or len(self.header) >= HEADER_LIMIT:
+                return 'Загрузите правильное изображение.'
+            return None
+        self.header_checked = True
+        self.header = b''
+        if width * height > self.max_pixels:
+            return f'Слишком большое разрешение картинки: {width}×{height}.'
+        return None
+
+    def reject(self, message):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = message
+
+    def receive_data_chunk(self, raw_data, start):
+        error = None
+        if start + len(raw_data) > self.max_bytes:
+            error = ('Картинка должна быть не больше '
+                     f'{filesizeformat(self.max_bytes)}.')
+        elif not self.header_checked:
+            self.header += raw_data
+            error = self.header_error()
+        if error:
+            self.reject(error)
+            raise SkipFile(error)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        error = None if self.header_checked else self.header_error(True)
+        if error:
+            self.reject(error)
+            self.file.close()
+            return None
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+
+def stream_uploads(view):
+    """Включает StreamingImageUploadHandler для view.
+
+    Обработчики загрузки нельзя менять после чтения request.POST,
+    а CsrfViewMiddleware читает его раньше view, поэтому CSRF
+    проверяется уже внутри, после замены обработчиков.
+    """
+    protected = csrf_protect(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [StreamingImageUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return csrf_exempt(wrapper)
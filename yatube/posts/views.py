@@ -1,86 +1,185 @@
+from functools import partial
+
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Post, Group, User, Comment, Follow
-from django.core.paginator import Paginator
+from django.urls import reverse
+from .models import Post, Group, User, Comment, Follow, PostCounter
 from django.contrib.auth.decorators import login_required
 from .forms import PostForm, CommentForm
-from django.views.decorators.cache import cache_page
+from .caching import (
+    ALL, AUTHOR, GROUP, POST, cache_context, conditional_page, page_cache
+)
+from .counters import get_post_count
+from .paginators import CursorPaginator, paginate
+from .search import search
+from .thumbnails import reset_renditions, schedule_thumbnail
+from .timeline import follow_feed
+from .uploads import stream_uploads
 
 
 DEF_VALUE: int = 10
+COMMENTS_PER_PAGE: int = 20
+
+
+def group_scopes(slug):
+    group_id = Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+    if group_id is not None:
+        return ((GROUP, group_id),)
+
+
+def profile_scopes(username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    if author_id is not None:
+        return ((AUTHOR, author_id),)
 
 
-@cache_page(20, key_prefix='index_page')
+def post_scopes(post_id):
+    owner = Post.objects.filter(
+        pk=post_id
+    ).values_list('author_id', 'group_id').first()
+    if owner is not None:
+        author_id, group_id = owner
+        return ((POST, post_id), (AUTHOR, author_id), (GROUP, group_id or 0))
+
+
+@conditional_page()
+@page_cache('index_page')
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, DEF_VALUE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page_obj = paginate(request, post_list, DEF_VALUE, get_post_count)
     context = {
         'page_obj': page_obj,
+        **cache_context((ALL, 0)),
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_scopes)
+@page_cache('group_page', group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    post_list = Post.objects.filter(group=group)
-    paginator = Paginator(post_list, DEF_VALUE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed().filter(group=group)
+    page_obj = paginate(
+        request, post_list, DEF_VALUE,
+        partial(get_post_count, PostCounter.GROUP, group.pk)
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        **cache_context((GROUP, group.pk)),
     }
     return render(request, template, context)
 
 
+@conditional_page(profile_scopes)
+@page_cache('profile_page', profile_scopes)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    paginator = Paginator(posts, DEF_VALUE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.for_feed().filter(author=author)
+    posts_count = get_post_count(PostCounter.AUTHOR, author.pk)
+    page_obj = paginate(request, posts, DEF_VALUE, lambda: posts_count)
     following = (
         request.user.is_authenticated
         and author.following.filter(user=request.user).exists()
     )
-    posts_count = posts.count()
     context = {
         'author': author,
         'posts': posts,
         'page_obj': page_obj,
         'following': following,
         'posts_count': posts_count,
+        **cache_context((AUTHOR, author.pk)),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def get_comments_page(request, post_id):
+    comments = Comment.objects.for_thread().filter(post_id=post_id)
+    paginator = CursorPaginator(
+        comments, COMMENTS_PER_PAGE, 'created', descending=False
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@conditional_page(post_scopes)
+@page_cache('post_page', post_scopes)
 def post_detail(request, post_id):
-    post = Post.objects.get(id=post_id)
-    comment = Comment.objects.filter(post_id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
     comment_form = CommentForm(request.POST or None)
     context = {
         'post': post,
-        'comments': comment,
+        'comments': get_comments_page(request, post_id),
         'comment_form': comment_form,
+        'author_posts_count': get_post_count(
+            PostCounter.AUTHOR, post.author_id
+        ),
+        **cache_context(
+            (POST, post.pk),
+            (AUTHOR, post.author_id),
+            (GROUP, post.group_id or 0),
+        ),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев для кнопки «Показать еще»."""
+    # Неизвестный пост — 404, как у страницы поста, а не пустой список.
+    get_object_or_404(Post.objects.only('id'), id=post_id)
+    page = get_comments_page(request, post_id)
+    comments = [
+        {
+            'id': comment.id,
+            'author': comment.author.username,
+            'author_url': reverse('posts:profile', args=(comment.author,)),
+            'text': comment.text,
+            'created': comment.created.isoformat(),
+        }
+        for comment in page
+    ]
+    return JsonResponse({
+        'comments': comments,
+        'next_cursor': page.next_cursor,
+    })
+
+
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    results, next_cursor = search(
+        query, request.GET.get('cursor'), DEF_VALUE
+    )
+    context = {
+        'query': query,
+        'results': results,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@stream_uploads
 def post_create(request):
     form = PostForm(request.POST,
-                    request.FILES)
+                    request.FILES,
+                    upload_errors=request.upload_errors)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnail(post)
         return redirect('posts:profile', request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
 @login_required
+@stream_uploads
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if not post.author == request.user:
@@ -88,7 +187,8 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post)
+        instance=post,
+        upload_errors=request.upload_errors)
     context = {
         'post_id': post_id,
         'form': form,
@@ -97,7 +197,11 @@ def post_edit(request, post_id):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
+        if 'image' in form.changed_data:
+            reset_renditions(post)
         post.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnail(post)
         return redirect('posts:post_detail', post_id=post.id)
 
     return render(request, 'posts/create_post.html', context)
@@ -117,10 +221,8 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, DEF_VALUE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = follow_feed(request.user)
+    page_obj = paginate(request, post_list, DEF_VALUE, date_field='feed_date')
     context = {
         'page_obj': page_obj,
     }
@@ -132,12 +234,7 @@ def profile_follow(request, username):
     if request.user.username == username:
         return redirect('posts:profile', username=username)
     following = get_object_or_404(User, username=username)
-    already_follows = Follow.objects.filter(
-        user=request.user,
-        author=following
-    ).exists()
-    if not already_follows:
-        Follow.objects.create(user=request.user, author=following)
+    Follow.objects.get_or_create(user=request.user, author=following)
     return redirect('posts:profile', username=username)
 
 
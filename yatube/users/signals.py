@@ -0,0 +1,27 @@
+from django.contrib.auth.signals import (
+    user_logged_in, user_logged_out, user_login_failed
+)
+from django.dispatch import receiver
+
+from core import metrics
+
+AUTH_EVENTS = metrics.counter(
+    'yatube_auth_events_total',
+    'События входа: login, logout, login_failed, signup.',
+    ('event',),
+)
+
+
+@receiver(user_logged_in)
+def count_login(sender, **kwargs):
+    AUTH_EVENTS.inc(event='login')
+
+
+@receiver(user_logged_out)
+def count_logout(sender, **kwargs):
+    AUTH_EVENTS.inc(event='logout')
+
+
+@receiver(user_login_failed)
+def count_login_failed(sender, **kwargs):
+    AUTH_EVENTS.inc(event='login_failed')
@@ -1,9 +1,15 @@
 from django.views.generic import CreateView
 from django.urls import reverse_lazy
 from .forms import CreationForm
+from .signals import AUTH_EVENTS
 
 
 class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        AUTH_EVENTS.inc(event='signup')
+        return response
@@ -51,6 +51,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.sampler.SamplingProfilerMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -136,6 +140,18 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+# Боевой режим раздачи файлов: collectstatic пишет имена с хэшем,
+# а статику и медиа отдает WSGI-обертка core.assets.AssetServer,
+# не доходя до Django (immutable-кэш, Range, ETag, sendfile).
+SERVE_ASSETS = os.getenv('SERVE_ASSETS', '') == '1'
+
+if SERVE_ASSETS:
+    STATICFILES_STORAGE = (
+        'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+    )
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -152,8 +168,138 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Картинки постов пишутся кусками во временный файл рядом с MEDIA_ROOT:
+# на той же файловой системе он переносится в хранилище без копирования.
+# Не внутри MEDIA_ROOT: недокачанные файлы не должны раздаваться.
+FILE_UPLOAD_TEMP_DIR = os.path.join(BASE_DIR, 'uploads')
+
+# Служебные файлы хранилища картинок (блокировка, брони загрузок) —
+# тоже вне MEDIA_ROOT: их нельзя раздавать.
+MEDIA_STATE_DIR = os.path.join(BASE_DIR, 'media_state')
+
+# Лимиты картинки поста: размер файла и число пикселей по заголовку
+# (защита от «бомб», которые раздуваются при распаковке).
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+# Общий кэш выбирается переменными окружения: при нескольких воркерах
+# нужен кэш, видимый всем процессам (memcached, redis). Для локальной
+# проверки подойдут файловый кэш или таблица в SQLite
+# (для db перед запуском нужен manage.py createcachetable).
+SHARED_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'memcached': 'django.core.cache.backends.memcached.PyLibMCCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+
+SHARED_CACHE_BACKEND = os.getenv('SHARED_CACHE_BACKEND', 'locmem')
+
+SHARED_CACHE_LOCATION = os.getenv('SHARED_CACHE_LOCATION', {
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'db': 'cache_table',
+}.get(SHARED_CACHE_BACKEND, ''))
+
+SHARED_CACHE_ALIAS = 'shared'
+
+# default — ближний кэш в памяти процесса перед общим (core.cache).
+# Изменяемые значения, например поколения кэша лент, читаются
+# из shared напрямую.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.NearCache',
+        'OPTIONS': {
+            'SHARED_ALIAS': SHARED_CACHE_ALIAS,
+            'LOCAL_TIMEOUT': 5,
+            'MAX_ENTRIES': 1000,
+            'MAX_BYTES': 16 * 1024 * 1024,
+        },
+    },
+    SHARED_CACHE_ALIAS: {
+        'BACKEND': SHARED_CACHE_BACKENDS[SHARED_CACHE_BACKEND],
+        'LOCATION': SHARED_CACHE_LOCATION,
+    },
+}
+
+# Страницы и фрагменты лент сбрасываются при каждой записи в посты
+# (см. posts.caching), поэтому срок жизни кэша может быть долгим.
+FEED_CACHE_TIMEOUT = 60 * 5
+
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# подписчиков при публикации, их посты читаются при показе ленты.
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Потоки, которые готовят превью картинок после публикации;
+# 0 — превью делается сразу в запросе (удобно в тестах и отладке).
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
+
+# Массовые действия админки (posts.jobs): потоки, выполняющие задания,
+# и число постов в одной транзакции. Один поток — задания не спорят
+# за блокировку записи SQLite; 0 — задание выполняется в запросе.
+BULK_JOB_WORKERS = int(os.getenv('BULK_JOB_WORKERS', 1))
+BULK_JOB_BATCH_SIZE = 200
+
+# Доля запросов, которые замеряет core.profiling.ProfilingMiddleware
+# (SQL, шаблоны, кэш → лог core.profiling, /profiling/ и Server-Timing
+# для персонала).
+PROFILING_SAMPLE_RATE = float(
+    os.getenv('PROFILING_SAMPLE_RATE', 0 if DEBUG else 0.01)
+)
+
+# Метрики (core.metrics, /metrics). При нескольких воркерах (gunicorn)
+# каждый пишет свои значения в METRICS_DIR — общий каталог на машине,
+# /metrics складывает их. Пустое значение — только этот процесс.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = 1.0
+# Токен для /metrics (Authorization: Bearer ...); пустой — без проверки.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Профили отдельных запросов (core.sampler): стеки в формате
+# flamegraph.pl/speedscope пишутся в PROFILER_DIR. Запрос профилируется
+# по подписанному заголовку X-Profile (manage.py profile_token) или
+# по доле запросов, включенной на время в /admin/profiler/.
+PROFILER_DIR = os.getenv('PROFILER_DIR', os.path.join(BASE_DIR, 'profiles'))
+# Шаг снятия стека, секунды.
+PROFILER_INTERVAL = 0.005
+# Срок действия токена заголовка X-Profile, секунды.
+PROFILER_TOKEN_MAX_AGE = 60 * 60
+# Сколько последних профилей хранить в PROFILER_DIR.
+PROFILER_MAX_CAPTURES = 500
+
+# Журнал медленных SQL-запросов (core.slow_queries, /admin/slow-queries/):
+# порог в миллисекундах (None — не проверять) и число хранимых запросов.
+# Пустая переменная окружения SLOW_QUERY_THRESHOLD_MS выключает журнал.
+SLOW_QUERY_THRESHOLD_MS = os.getenv('SLOW_QUERY_THRESHOLD_MS', '100').strip()
+SLOW_QUERY_THRESHOLD_MS = (float(SLOW_QUERY_THRESHOLD_MS)
+                           if SLOW_QUERY_THRESHOLD_MS else None)
+SLOW_QUERY_TOP_N = 50
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
 }
+
+# Отчеты нагрузочного теста (manage.py run_benchmark).
+BENCHMARK_DIR = os.path.join(BASE_DIR, 'benchmarks')
+
+# Поиск по постам и комментариям (posts.search): по умолчанию FTS5
+# в SQLite, для других СУБД — поиск без индекса. Можно указать свой
+# класс-наследник posts.search.SearchBackend.
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', '')
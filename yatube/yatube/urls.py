@@ -18,10 +18,17 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import (metrics, profiler_capture, profiler_captures,
+                        profiling_stats, slow_queries)
+
 handler403 = 'core.views.csrf_failure'
 handler404 = 'core.views.page_not_found'
 
 urlpatterns = [
+    path('admin/profiler/', profiler_captures, name='profiler_captures'),
+    path('admin/profiler/<str:name>/', profiler_capture,
+         name='profiler_capture'),
+    path('admin/slow-queries/', slow_queries, name='slow_queries'),
     path('admin/', admin.site.urls),
     path('', include('posts.urls', namespace='posts')),
     path('profile/<str:username>/', include('posts.urls', namespace='posts')),
@@ -30,6 +37,8 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('profiling/', profiling_stats, name='profiling_stats'),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG: